@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of mathx.core.linalg against sympy matrices.
+
+    python benchmarks/linalg.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+import sympy
+
+# run from a checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mathx.core.expression import Expr, Symbol
+from mathx.core.linalg import det, dot, eigenvalues, inverse, linear_solve
+from mathx.core.numbers import Integer, MachineReal, PrecisionReal
+
+SymbolList = Symbol('List')
+
+
+def bench(name, stmt, number=3):
+    seconds = min(timeit.repeat(stmt, number=number, repeat=3)) / number
+    print(f'{name:<40} {seconds * 1000:10.3f} ms')
+
+
+def matrix(rows, number):
+    return Expr(SymbolList, *(Expr(SymbolList, *map(number, row)) for row in rows))
+
+
+def main():
+    random.seed(0)
+
+    for n in (20, 60):
+        rows = [[random.randint(-99, 99) for _ in range(n)] for _ in range(n)]
+        exact = matrix(rows, Integer)
+        machine = matrix(rows, MachineReal)
+        precision = matrix(rows, lambda x: PrecisionReal(sympy.Float(x, 30)))
+        vector = Expr(SymbolList, *map(Integer, rows[0]))
+        s = sympy.Matrix(rows)
+
+        bench(f'det {n}x{n} exact mathx', lambda: det(exact))
+        bench(f'det {n}x{n} exact sympy', lambda: s.det(method='bareiss'), number=1)
+        bench(f'inverse {n}x{n} exact mathx', lambda: inverse(exact), number=1)
+        bench(f'linear_solve {n}x{n} exact mathx', lambda: linear_solve(exact, vector))
+        bench(f'linear_solve {n}x{n} exact sympy', lambda: s.LUsolve(sympy.Matrix(rows[0])), number=1)
+        bench(f'dot {n}x{n} exact mathx', lambda: dot(exact, exact))
+        bench(f'dot {n}x{n} exact sympy', lambda: s * s)
+        bench(f'inverse {n}x{n} machine mathx', lambda: inverse(machine))
+        bench(f'eigenvalues {n}x{n} machine mathx', lambda: eigenvalues(machine))
+        bench(f'det {n}x{n} precision mathx', lambda: det(precision), number=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the Integer/Rational backends of mathx.core.numbers.
+
+    python benchmarks/number_backends.py
+"""
+
+import os
+import sys
+import timeit
+
+import sympy
+
+# run from a checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mathx.core import numbers
+from mathx.core.numbers import Integer, Rational, to_python, to_sympy
+
+
+def bench(name, stmt, number=3):
+    seconds = min(timeit.repeat(stmt, number=number, repeat=3)) / number
+    print(f'{name:<48} {seconds * 1000:10.3f} ms')
+
+
+def continued_fraction(n: int):
+    """
+    Convergent of the continued fraction [1; 2, 3, ..., n] as Rational.
+    """
+    value = Rational(n)._value
+
+    for k in range(n - 1, 0, -1):
+        value = k + 1 / value
+
+    return Rational(value)
+
+
+def factorial(n: int):
+    value = Integer(1)._value
+
+    for k in range(2, n + 1):
+        value *= k
+
+    return Integer(value)
+
+
+def binomial_sum(n: int):
+    """
+    Sum of the binomials C(n, k) / (k + 1), exact.
+    """
+    term = Integer(1)._value
+    total = Rational(0)._value
+
+    for k in range(n + 1):
+        total += Rational(term, k + 1)._value
+        term = term * (n - k) // (k + 1)
+
+    return Rational(total)
+
+
+def main():
+    big = factorial(3000)
+    ratio = continued_fraction(500)
+
+    for name in sorted(numbers.backends):
+        numbers.set_backend(name)
+        bench(f'[{name}] continued fraction 2000', lambda: continued_fraction(2000))
+        bench(f'[{name}] factorial 20000', lambda: factorial(20000))
+        bench(f'[{name}] binomial sum 1000', lambda: binomial_sum(1000))
+        bench(f'[{name}] to_sympy Integer 3000!', lambda: to_sympy(big), number=100)
+        bench(f'[{name}] to_sympy Rational', lambda: to_sympy(ratio), number=100)
+        bench(f'[{name}] to_python Integer 3000!', lambda: to_python(big), number=100)
+
+    bench('[sympy] continued fraction 2000', lambda: sympy.continued_fraction_reduce(range(1, 2001)))
+    bench('[sympy] factorial 20000', lambda: sympy.factorial(20000))
+
+
+if __name__ == '__main__':
+    main()
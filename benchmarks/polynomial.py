@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of mathx.core.polynomial against sympy.
+
+    python benchmarks/polynomial.py
+"""
+
+import os
+import sys
+import timeit
+
+import sympy
+
+from sympy.core.cache import clear_cache
+
+# run from a checkout without installing
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mathx.core.expression import Symbol
+from mathx.core.polynomial import Poly
+
+
+def uncached(f):
+    """
+    f run after clearing sympy's cache, which would otherwise return the
+    result of the previous run.
+    """
+
+    def run():
+        clear_cache()
+        return f()
+
+    return run
+
+
+def bench(name, stmt, number=3):
+    seconds = min(timeit.repeat(stmt, number=number, repeat=3)) / number
+    print(f'{name:<40} {seconds * 1000:10.3f} ms')
+
+
+def main():
+    gens = Symbol('x'), Symbol('y'), Symbol('z')
+    x, y, z = (Poly.generator(i, gens) for i in range(3))
+    sx, sy, sz = sympy.symbols('x y z')
+
+    for n in (5, 10, 20):
+        bench(f'expand (1+x+y+z)^{n} mathx', lambda: (1 + x + y + z) ** n)
+        bench(f'expand (1+x+y+z)^{n} sympy', uncached(lambda: sympy.expand((1 + sx + sy + sz) ** n)))
+        bench(f'expand (1+x+y+z)^{n} sympy.Poly', uncached(lambda: sympy.Poly(1 + sx + sy + sz) ** n))
+
+    f = (x * y + z + 3) ** 4 * (x - y) ** 3
+    g = (x * y + z + 3) ** 3 * (x + z) ** 2
+    bench('to_expr mathx', lambda: f.to_expr())
+    bench('gcd mathx', lambda: f.gcd(g))
+    sympy_f = ((sx * sy + sz + 3) ** 4 * (sx - sy) ** 3).expand()
+    sympy_g = ((sx * sy + sz + 3) ** 3 * (sx + sz) ** 2).expand()
+    bench('gcd sympy', uncached(lambda: sympy.gcd(sympy_f, sympy_g)))
+
+    u = sum(((i % 7) - 3) * Poly.generator(0, gens[:1]) ** i for i in range(2000))
+    su = sympy.Poly(sum(((i % 7) - 3) * sx ** i for i in range(2000)), sx)
+    bench('dense univariate product 2000 mathx', lambda: u * u)
+    bench('dense univariate product 2000 sympy', uncached(lambda: su * su))
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,14 @@ class ContextName(object):
     def name(self):
         return self._name
 
+    def __eq__(self, other):
+        return (isinstance(other, ContextName)
+                and self._context == other._context
+                and self._name == other._name)
+
+    def __hash__(self):
+        return hash((self._context, self._name))
+
     def __str__(self):
         return self._context + "`" + self._name
 
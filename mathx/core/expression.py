@@ -1,3 +1,5 @@
+import sys
+
 from .basic import Basic, Atom
 from .context import ContextName
 
@@ -9,14 +11,56 @@ class Expr(Basic):
     """
     is_expr = True
 
-    __slots__ = ['_head', '_leaves']
+    __slots__ = ['_head', '_leaves', '_leaf_count', '_depth', '_byte_count']
 
     def __new__(cls, head, *leaves):
         obj = super(Expr, cls).__new__(cls)
         obj._head = head
         obj._leaves = tuple(leaves)
+        obj._measure()
+        return obj
+
+    @classmethod
+    def from_leaves(cls, head, leaves) -> 'Expr':
+        """
+        Create expression on an existing leaves storage without copying
+        it, the storage is a tuple or any sequence caching the
+        `leaf_count`, `depth` and `byte_count` of its leaves, like
+        `mathx.core.leaves.LeafVector`.
+        """
+        obj = super(Expr, cls).__new__(cls)
+        obj._head = head
+        obj._leaves = leaves
+        obj._measure()
         return obj
 
+    def _measure(self):
+        """
+        Cache the size information of this node. Expression is immutable
+        so it is computed only once, from the already cached values of
+        the head and leaves.
+        """
+        leaves = self._leaves
+        leaf_count = self._head.leaf_count
+        depth = 0
+        byte_count = sys.getsizeof(self) + sys.getsizeof(leaves) + self._head.byte_count
+
+        if isinstance(leaves, tuple):
+
+            for leaf in leaves:
+                leaf_count += leaf.leaf_count
+                depth = max(depth, leaf.depth)
+                byte_count += leaf.byte_count
+
+        else:
+            leaf_count += leaves.leaf_count
+            depth = leaves.depth
+            byte_count += leaves.byte_count
+
+        self._leaf_count = leaf_count
+        self._depth = depth + 1
+        self._byte_count = byte_count
+
     @property
     def head(self):
         return self._head
@@ -25,6 +69,32 @@ class Expr(Basic):
     def leaves(self):
         return self._leaves
 
+    @property
+    def leaf_count(self) -> int:
+        """
+        Total number of indivisible subexpressions, heads included.
+        """
+        return self._leaf_count
+
+    @property
+    def depth(self) -> int:
+        """
+        Maximum number of indices needed to specify any part, plus one.
+        Heads are not counted.
+        """
+        return self._depth
+
+    @property
+    def byte_count(self) -> int:
+        """
+        Number of bytes used by the whole tree. A subtree referenced
+        several times is counted for each reference, see
+        `mathx.core.memory.byte_count` for the shared count.
+        """
+        if self._byte_count is None:
+            self._byte_count = self._sizeof()
+        return self._byte_count
+
     # def __repr__(self):
     #     return f"<Expression: {self}>"
 
@@ -37,6 +107,16 @@ class AtomicExpr(Atom, Expr):
         obj = super(AtomicExpr, cls).__new__(cls, Symbol(cls.__name__))
         return obj
 
+    def _measure(self):
+        # Value of the atom is not assigned yet, its bytes are
+        # computed on first request.
+        self._leaf_count = 1
+        self._depth = 1
+        self._byte_count = None
+
+    def _sizeof(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self._value)
+
 
 class Symbol(AtomicExpr):
     """
@@ -50,7 +130,7 @@ class Symbol(AtomicExpr):
     def __new__(cls, name: str, *, unit=False):
         if "`" in name:
             i = name.rfind("`")
-            ctx_name = ContextName(name[:i], name[i:])
+            ctx_name = ContextName(name[:i], name[i + 1:])
         else:
             ctx_name = ContextName("System", name)
 
@@ -66,6 +146,10 @@ class Symbol(AtomicExpr):
             Symbol._cache[ctx_name] = obj
             return obj
 
+    def _sizeof(self) -> int:
+        # Symbols are unique and shared by every expression using them
+        return 0
+
     @property
     def name(self):
         return self._ctx_name.name
@@ -82,7 +166,7 @@ class Symbol(AtomicExpr):
         return self.name
 
     def __repr__(self):
-        return f"<{self.__class__.__name__}: {self.ctx_name}>"
+        return f"<{self.__class__.__name__}: {self._ctx_name}>"
 
 
 Symbol0 = Symbol("Symbol", unit=True)
@@ -0,0 +1,438 @@
+import sys
+import zlib
+
+from bisect import bisect_right
+from collections.abc import Sequence
+
+# Maximum number of children of a node of LeafVector
+CHUNK = 32
+
+
+class _Node(object):
+    """
+    Node of LeafVector. When `height` is 0 the children are the leaves
+    themselves, otherwise they are nodes of `height - 1` and `offsets`
+    holds the cumulative number of leaves up to each child.
+
+    Aggregates of the leaves below are cached so that an updated path
+    is recomputed in O(CHUNK) per level.
+    """
+
+    __slots__ = ['children', 'offsets', 'height', 'size', 'leaf_count', 'depth', 'byte_count', 'overhead']
+
+    def __new__(cls, children: tuple, height: int) -> '_Node':
+        obj = super(_Node, cls).__new__(cls)
+        obj.children = children
+        obj.height = height
+        obj.overhead = sys.getsizeof(obj) + sys.getsizeof(children)
+
+        if height == 0:
+            obj.offsets = None
+            obj.size = len(children)
+            obj.leaf_count = sum(leaf.leaf_count for leaf in children)
+            obj.depth = max((leaf.depth for leaf in children), default=0)
+            obj.byte_count = sum(leaf.byte_count for leaf in children)
+
+        else:
+            offsets = []
+            size = 0
+
+            for child in children:
+                size += child.size
+                offsets.append(size)
+
+            obj.offsets = tuple(offsets)
+            obj.size = size
+            obj.leaf_count = sum(child.leaf_count for child in children)
+            obj.depth = max((child.depth for child in children), default=0)
+            obj.byte_count = sum(child.byte_count for child in children)
+            obj.overhead += sys.getsizeof(obj.offsets) + sum(child.overhead for child in children)
+
+        return obj
+
+    def locate(self, i: int):
+        """
+        Index of the child holding leaf i, and the position of the leaf
+        inside that child.
+        """
+        k = bisect_right(self.offsets, i)
+        return k, (i - self.offsets[k - 1] if k else i)
+
+    def replace(self, k: int, child) -> '_Node':
+        """
+        Copy with child k replaced, aggregates are updated from the
+        difference instead of summing all children again.
+        """
+        old = self.children[k]
+        children = self.children[:k] + (child,) + self.children[k + 1:]
+        obj = self._derive(children, old, child)
+
+        if self.height:
+            delta = child.size - old.size
+            obj.offsets = self.offsets[:k] + tuple(offset + delta for offset in self.offsets[k:])
+            obj.size = self.size + delta
+
+        return obj
+
+    def push(self, child) -> '_Node':
+        """
+        Copy with child added at the end.
+        """
+        obj = self._derive(self.children + (child,), None, child)
+
+        if self.height:
+            obj.offsets = self.offsets + (self.size + child.size,)
+            obj.size = self.size + child.size
+            obj.overhead += sys.getsizeof(obj.offsets) - sys.getsizeof(self.offsets)
+
+        return obj
+
+    def _derive(self, children: tuple, old, new) -> '_Node':
+        obj = super(_Node, _Node).__new__(_Node)
+        obj.children = children
+        obj.height = self.height
+        obj.offsets = None
+        obj.size = len(children)
+        obj.leaf_count = self.leaf_count + new.leaf_count
+        obj.byte_count = self.byte_count + new.byte_count
+        obj.overhead = self.overhead + sys.getsizeof(children) - sys.getsizeof(self.children)
+
+        if self.height:
+            obj.overhead += new.overhead
+
+        if old is not None:
+            obj.leaf_count -= old.leaf_count
+            obj.byte_count -= old.byte_count
+
+            if self.height:
+                obj.overhead -= old.overhead
+
+        if new.depth >= self.depth or not children:
+            obj.depth = new.depth
+
+        elif old is None or old.depth < self.depth:
+            obj.depth = self.depth
+
+        else:
+            obj.depth = max(child.depth for child in children)
+
+        return obj
+
+
+_empty = _Node((), 0)
+
+
+def _get(node: _Node, i: int):
+
+    while node.height:
+        k, i = node.locate(i)
+        node = node.children[k]
+
+    return node.children[i]
+
+
+def _set(node: _Node, i: int, value) -> _Node:
+
+    if node.height == 0:
+        return node.replace(i, value)
+
+    k, j = node.locate(i)
+    return node.replace(k, _set(node.children[k], j, value))
+
+
+def _append(node: _Node, value):
+    """
+    Returns the updated node, and a new node of the same height when
+    there was no room left in `node`.
+    """
+
+    if node.height == 0:
+
+        if len(node.children) < CHUNK:
+            return node.push(value), None
+
+        else:
+            return node, _Node((value,), 0)
+
+    last, overflow = _append(node.children[-1], value)
+    node = node.replace(len(node.children) - 1, last)
+
+    if overflow is None:
+        return node, None
+
+    elif len(node.children) < CHUNK:
+        return node.push(overflow), None
+
+    else:
+        return node, _Node((overflow,), node.height)
+
+
+def _take(node: _Node, n: int) -> _Node:
+    """
+    First n leaves of node, 0 < n <= node.size
+    """
+
+    if node.height == 0:
+        return _Node(node.children[:n], 0)
+
+    k, j = node.locate(n - 1)
+    return _Node(node.children[:k] + (_take(node.children[k], j + 1),), node.height)
+
+
+def _drop(node: _Node, n: int) -> _Node:
+    """
+    All but the first n leaves of node, 0 <= n < node.size
+    """
+
+    if node.height == 0:
+        return _Node(node.children[n:], 0)
+
+    k, j = node.locate(n)
+    child = node.children[k]
+
+    if j:
+        child = _drop(child, j)
+
+    return _Node((child,) + node.children[k + 1:], node.height)
+
+
+def _trim(node: _Node) -> _Node:
+    # Remove the levels left with a single child after slicing
+    while node.height and len(node.children) == 1:
+        node = node.children[0]
+
+    return node
+
+
+class LeafStorage(Sequence):
+    """
+    Base of the sequences that can hold the leaves of an expression in
+    place of a tuple. Besides the sequence protocol they provide the
+    `leaf_count`, `depth` and `byte_count` aggregates of their leaves,
+    and report their own overhead through `__sizeof__`.
+    """
+
+    __slots__ = []
+
+    def _item(self, i: int):
+        raise NotImplementedError
+
+    def _index(self, i: int) -> int:
+        n = len(self)
+
+        if i < 0:
+            i += n
+
+        if not 0 <= i < n:
+            raise IndexError(f'{self.__class__.__name__} index out of range')
+
+        return i
+
+    def __getitem__(self, i):
+
+        if isinstance(i, slice):
+            return tuple(self)[i]
+
+        return self._item(self._index(i))
+
+    def __eq__(self, other):
+
+        if not isinstance(other, (tuple, LeafStorage)):
+            return NotImplemented
+
+        return len(self) == len(other) and all(a is b or a == b for a, b in zip(self, other))
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} leaves>"
+
+
+class LeafVector(LeafStorage):
+    """
+    Persistent sequence of leaves for large expressions.
+
+    Leaves are kept in a tree of chunks, an updated copy shares every
+    chunk but the ones on the path to the change, so `set`, `append`,
+    `take` and `drop` are O(log n) instead of copying the whole tuple.
+    It can be used in place of a tuple by the callers of `Expr.leaves`.
+    """
+
+    __slots__ = ['_root']
+
+    def __new__(cls, leaves=()) -> 'LeafVector':
+
+        if isinstance(leaves, LeafVector):
+            return leaves
+
+        nodes = [_Node(chunk, 0) for chunk in _chunks(tuple(leaves))]
+        height = 0
+
+        while len(nodes) > 1:
+            height += 1
+            nodes = [_Node(chunk, height) for chunk in _chunks(tuple(nodes))]
+
+        return cls._new(nodes[0] if nodes else _empty)
+
+    @classmethod
+    def _new(cls, root: _Node) -> 'LeafVector':
+        obj = super(LeafVector, cls).__new__(cls)
+        obj._root = root
+        return obj
+
+    @property
+    def leaf_count(self) -> int:
+        return self._root.leaf_count
+
+    @property
+    def depth(self) -> int:
+        return self._root.depth
+
+    @property
+    def byte_count(self) -> int:
+        return self._root.byte_count
+
+    def set(self, i: int, value) -> 'LeafVector':
+        return LeafVector._new(_set(self._root, self._index(i), value))
+
+    def append(self, value) -> 'LeafVector':
+        root, overflow = _append(self._root, value)
+
+        if overflow is not None:
+            root = _Node((root, overflow), root.height + 1)
+
+        return LeafVector._new(root)
+
+    def take(self, n: int) -> 'LeafVector':
+        """
+        First n leaves.
+        """
+        if n <= 0:
+            return LeafVector._new(_empty)
+
+        if n >= len(self):
+            return self
+
+        return LeafVector._new(_trim(_take(self._root, n)))
+
+    def drop(self, n: int) -> 'LeafVector':
+        """
+        All but the first n leaves.
+        """
+        if n <= 0:
+            return self
+
+        if n >= len(self):
+            return LeafVector._new(_empty)
+
+        return LeafVector._new(_trim(_drop(self._root, n)))
+
+    def __len__(self):
+        return self._root.size
+
+    def _item(self, i: int):
+        return _get(self._root, i)
+
+    def __iter__(self):
+        stack = [self._root]
+
+        while stack:
+            node = stack.pop()
+
+            if node.height == 0:
+                yield from node.children
+
+            else:
+                stack.extend(reversed(node.children))
+
+    def __sizeof__(self):
+        # The leaves are not included, same as for a tuple
+        return object.__sizeof__(self) + self._root.overhead
+
+
+class PackedLeaves(LeafStorage):
+    """
+    Leaves of machine numbers packed in a buffer of float64 ('d') or
+    int64 ('q'), `element` is the number type built from an item on
+    access. The buffer is not copied, so it may live in a memory map.
+    """
+
+    __slots__ = ['_data', '_element']
+
+    def __new__(cls, data, element) -> 'PackedLeaves':
+        obj = super(PackedLeaves, cls).__new__(cls)
+        obj._data = memoryview(data)
+        obj._element = element
+
+        if obj._data.format not in ('d', 'q'):
+            raise TypeError(f'unsupported packed format {obj._data.format!r}')
+
+        return obj
+
+    @property
+    def data(self) -> memoryview:
+        return self._data
+
+    @property
+    def typecode(self) -> str:
+        return self._data.format
+
+    @property
+    def array(self):
+        """
+        Zero-copy NumPy view of the packed numbers.
+        """
+        import numpy
+        return numpy.frombuffer(self._data, dtype=self._data.format)
+
+    @property
+    def leaf_count(self) -> int:
+        return len(self._data)
+
+    @property
+    def depth(self) -> int:
+        return 1 if len(self._data) else 0
+
+    @property
+    def byte_count(self) -> int:
+        # Items exist only in the buffer, see __sizeof__
+        return 0
+
+    def _item(self, i: int):
+        return self._element(self._data[i])
+
+    def _bytes(self):
+        data = self._data
+        return data.cast('B') if data.c_contiguous else data.tobytes()
+
+    def __eq__(self, other):
+
+        if isinstance(other, PackedLeaves):
+            # compared in place, the buffer may be a memory map
+            return self.typecode == other.typecode and self._bytes() == other._bytes()
+
+        if isinstance(other, (tuple, LeafStorage)):
+            # numbers are built on access, they are never leaves of another storage
+            return False
+
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.typecode, len(self._data), zlib.crc32(self._bytes())))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return map(self._element, self._data)
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + self._data.nbytes
+
+
+def _chunks(items: tuple):
+    return [items[i:i + CHUNK] for i in range(0, len(items), CHUNK)]
+
+
+__all__ = ['CHUNK', 'LeafStorage', 'LeafVector', 'PackedLeaves']
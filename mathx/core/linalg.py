@@ -0,0 +1,608 @@
+"""
+Linear algebra on numeric matrices.
+
+A rectangular `List` of `List`s of real numbers is read into a `Matrix`
+of one of three kinds, following the numbers it holds:
+
+- machine, if any entry is a MachineReal: a 2-D float64 NumPy array,
+  operations go to BLAS/LAPACK through NumPy.
+- precision, if any entry is a PrecisionReal: an mpmath matrix at the
+  lowest precision of the entries.
+- exact, if all entries are Integer or Rational: rows of ints and
+  rationals of the number backend, eliminations are fraction-free
+  (Bareiss) on the rows scaled to integers.
+
+Results are converted back to MathX numbers, machine and int64 rows are
+stored packed (see `mathx.core.leaves.PackedLeaves`).
+"""
+
+import mpmath
+import sympy
+
+from array import array
+from functools import reduce
+from math import lcm
+from mpmath import libmp
+from typing import List, Tuple, Union
+
+from . import numbers as nums
+from .expression import Expr, Symbol
+from .leaves import PackedLeaves
+from .numbers import Integer, Rational, MachineReal, PrecisionReal, Complex, Number
+
+SymbolList = Symbol('List')
+
+MACHINE = 'machine'
+PRECISION = 'precision'
+EXACT = 'exact'
+
+# Kinds in the order they win when matrices are combined
+_KINDS = (EXACT, PRECISION, MACHINE)
+
+
+class MatrixError(ValueError):
+    """
+    Raised when an expression is not a numeric matrix or vector, or when
+    the shapes of the operands do not match.
+    """
+
+
+class SingularMatrixError(MatrixError):
+    """
+    Raised when inverting or solving with a singular matrix.
+    """
+
+
+def _entry(number: Expr) -> Tuple[str, object, Union[int, None]]:
+    """
+    Kind, value and binary precision of a matrix entry.
+    """
+
+    if isinstance(number, (Integer, Rational)):
+        return EXACT, number._value, None
+
+    elif isinstance(number, MachineReal):
+        return MACHINE, number._value, None
+
+    elif isinstance(number, PrecisionReal):
+        return PRECISION, number._value, number._value._prec
+
+    raise MatrixError('matrix entries must be real numbers')
+
+
+def _rows(expr: Expr) -> Tuple[list, bool]:
+    """
+    Rows of a matrix expression, a vector is read as a single row.
+    """
+
+    if expr.is_atom or expr.head is not SymbolList or not len(expr.leaves):
+        raise MatrixError('expected a non-empty List')
+
+    if isinstance(expr.leaves, PackedLeaves) or all(leaf.is_atom for leaf in expr.leaves):
+        return [expr.leaves], True
+
+    rows = []
+
+    for row in expr.leaves:
+
+        if row.is_atom or row.head is not SymbolList:
+            raise MatrixError('expected a List of Lists')
+
+        rows.append(row.leaves)
+
+    if len(set(map(len, rows))) != 1 or not len(rows[0]):
+        raise MatrixError('matrix is not rectangular')
+
+    return rows, False
+
+
+def _exact_number(value) -> Number:
+
+    if value.denominator == 1:
+        return Integer(value.numerator)
+
+    return Rational(value.numerator, value.denominator)
+
+
+def _precision_number(value, prec: int) -> Number:
+
+    if isinstance(value, mpmath.mpc):
+        return Complex(_precision_number(value.real, prec), _precision_number(value.imag, prec))
+
+    # rounded at prec, not at the precision of the ambient context
+    with mpmath.workprec(prec):
+        mpf = mpmath.mpf(value)._mpf_
+
+    if mpf == libmp.fzero:
+        # Float._new gives the exact S.Zero for it
+        return PrecisionReal(sympy.Float(0, precision=prec))
+
+    return PrecisionReal(sympy.Float._new(mpf, prec))
+
+
+def _machine_number(value) -> Number:
+
+    if isinstance(value, complex) and value.imag:
+        return Complex(MachineReal(value.real), MachineReal(value.imag))
+
+    return MachineReal(value.real)
+
+
+class Matrix(object):
+    """
+    Numeric matrix of a single kind, see the module documentation.
+    `vector` marks a column read from (and written back as) a flat List.
+    """
+
+    __slots__ = ['_kind', '_data', '_shape', '_prec', '_vector']
+
+    def __new__(cls, kind: str, data, shape: Tuple[int, int], prec: int = None, vector: bool = False) -> 'Matrix':
+        obj = super(Matrix, cls).__new__(cls)
+        obj._kind = kind
+        obj._data = data
+        obj._shape = shape
+        obj._prec = prec
+        obj._vector = vector
+        return obj
+
+    @classmethod
+    def from_expr(cls, expr: Expr) -> 'Matrix':
+        """
+        Matrix of a rectangular List of Lists of real numbers, or column
+        of a List of real numbers.
+        """
+
+        rows, vector = _rows(expr)
+        kinds = set()
+        prec = None
+        values = []
+
+        for row in rows:
+
+            if isinstance(row, PackedLeaves):
+                # packed rows are read at once, no number is built
+                kinds.add(MACHINE if row.typecode == 'd' else EXACT)
+                values.append(row.array if row.typecode == 'd' else row.array.tolist())
+                continue
+
+            entries = [_entry(number) for number in row]
+            kinds.update(kind for kind, _, _ in entries)
+            precs = [p for _, _, p in entries if p is not None]
+
+            if precs:
+                prec = min(precs) if prec is None else min(prec, *precs)
+
+            values.append([value for _, value, _ in entries])
+
+        kind = max(kinds, key=_KINDS.index)
+        shape = (len(values), len(values[0]))
+
+        if kind == MACHINE:
+            import numpy
+            data = numpy.array([[float(x) for x in row] if isinstance(row, list) else row for row in values],
+                               dtype=numpy.float64)
+
+        elif kind == PRECISION:
+            with mpmath.workprec(prec):
+                data = mpmath.matrix([[_mpf(x) for x in row] for row in values])
+
+        else:
+            data = values
+
+        matrix = cls(kind, data, shape, prec)
+        return matrix.transpose(vector=True) if vector else matrix
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    @property
+    def is_vector(self) -> bool:
+        return self._vector
+
+    def transpose(self, vector: bool = False) -> 'Matrix':
+        rows, cols = self._shape
+
+        if self._kind == EXACT:
+            data = [list(col) for col in zip(*self._data)]
+
+        else:
+            data = self._data.T
+
+        return Matrix(self._kind, data, (cols, rows), self._prec, vector)
+
+    def astype(self, kind: str, prec: int = None) -> 'Matrix':
+        """
+        Same matrix converted to a kind winning over its own one.
+        """
+
+        if kind == self._kind and prec == self._prec:
+            return self
+
+        if kind == MACHINE:
+            import numpy
+
+            if self._kind == EXACT:
+                data = numpy.array([[float(x) for x in row] for row in self._data], dtype=numpy.float64)
+
+            else:
+                data = numpy.array(self._data.tolist(), dtype=numpy.float64)
+
+        elif kind == PRECISION:
+
+            with mpmath.workprec(prec):
+                data = mpmath.matrix([[_mpf(x) for x in row] for row in self.rows()])
+
+        else:
+            raise MatrixError(f'cannot convert {self._kind} matrix to {kind}')
+
+        return Matrix(kind, data, self._shape, prec, self._vector)
+
+    def rows(self) -> list:
+        """
+        Entries as nested python lists.
+        """
+
+        if self._kind == EXACT:
+            return self._data
+
+        return self._data.tolist()
+
+    def to_expr(self) -> Expr:
+        """
+        List of Lists of MathX numbers, or List for a vector.
+        """
+
+        if self._vector:
+            return self.transpose().to_expr().leaves[0]
+
+        if self._kind == MACHINE:
+            rows = _machine_rows(self._data)
+
+        elif self._kind == PRECISION:
+            rows = [Expr(SymbolList, *(_precision_number(x, self._prec) for x in row)) for row in self.rows()]
+
+        else:
+            rows = [_exact_row(row) for row in self._data]
+
+        return Expr(SymbolList, *rows)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self._kind} {self._shape[0]}x{self._shape[1]}>"
+
+
+def _mpf(x) -> mpmath.mpf:
+    """
+    mpmath number of an entry at the working precision.
+    """
+
+    if isinstance(x, sympy.Float):
+        return mpmath.mpf(x._mpf_)
+
+    if isinstance(x, (int, float, mpmath.mpf)):
+        return mpmath.mpf(x)
+
+    return mpmath.mpf(int(x.numerator)) / int(x.denominator)
+
+
+def _machine_rows(data) -> List[Expr]:
+    import numpy
+
+    data = numpy.ascontiguousarray(data, dtype=numpy.float64)
+    rows, cols = data.shape
+    flat = memoryview(data.reshape(-1))
+
+    # rows are views of one buffer, it is kept alive by them
+    return [Expr.from_leaves(SymbolList, PackedLeaves(flat[i * cols:(i + 1) * cols], MachineReal))
+            for i in range(rows)]
+
+
+def _exact_row(row: list) -> Expr:
+
+    if all(x.denominator == 1 and -2 ** 63 <= x < 2 ** 63 for x in row):
+        return Expr.from_leaves(SymbolList, PackedLeaves(array('q', [int(x) for x in row]), Integer))
+
+    return Expr(SymbolList, *map(_exact_number, row))
+
+
+def _common(*matrices: Matrix) -> List[Matrix]:
+    """
+    Operands converted to the kind winning among them.
+    """
+
+    kind = max((m.kind for m in matrices), key=_KINDS.index)
+    precs = [m._prec for m in matrices if m._prec is not None]
+    prec = min(precs) if kind == PRECISION else None
+    return [m.astype(kind, prec) for m in matrices]
+
+
+def _square(m: Matrix) -> int:
+
+    rows, cols = m.shape
+
+    if rows != cols or m.is_vector:
+        raise MatrixError(f'expected a square matrix, got {rows}x{cols}')
+
+    return rows
+
+
+def _integer_rows(rows: list) -> Tuple[list, list]:
+    """
+    Rows scaled to integers by the lcm of their denominators, and the
+    scale of each row.
+    """
+
+    scales = [reduce(lcm, (int(x.denominator) for x in row), 1) for row in rows]
+    scaled = [[nums.backend.integer(x.numerator * (s // x.denominator)) for x in row]
+              for row, s in zip(rows, scales)]
+    return scaled, scales
+
+
+def _bareiss_det(a: list):
+    """
+    Determinant of a square integer matrix, a is overwritten.
+    """
+
+    n = len(a)
+    sign = 1
+    prev = 1
+
+    for k in range(n - 1):
+
+        if not a[k][k]:
+            swap = next((i for i in range(k + 1, n) if a[i][k]), None)
+
+            if swap is None:
+                return 0
+
+            a[k], a[swap] = a[swap], a[k]
+            sign = -sign
+
+        pivot, rk = a[k][k], a[k]
+
+        for i in range(k + 1, n):
+            ri = a[i]
+            f = ri[k]
+
+            for j in range(k + 1, n):
+                # exact, prev divides every 2x2 minor of the step
+                ri[j] = (pivot * ri[j] - f * rk[j]) // prev
+
+        prev = pivot
+
+    return sign * a[n - 1][n - 1]
+
+
+def _bareiss_solve(a: list, b: list) -> list:
+    """
+    Solution x of a.x = b for a square integer matrix a, with a
+    fraction-free Gauss-Jordan elimination of [a | b]. Every pivot row
+    ends as det(a) (up to sign) times a row of the identity, so x is the
+    right block divided by the last pivot.
+    """
+
+    n = len(a)
+    m = [list(ra) + list(rb) for ra, rb in zip(a, b)]
+    width = len(m[0])
+    prev = 1
+
+    for k in range(n):
+
+        if not m[k][k]:
+            swap = next((i for i in range(k + 1, n) if m[i][k]), None)
+
+            if swap is None:
+                raise SingularMatrixError('matrix is singular')
+
+            m[k], m[swap] = m[swap], m[k]
+
+        pivot, rk = m[k][k], m[k]
+
+        for i in range(n):
+
+            if i == k:
+                continue
+
+            ri = m[i]
+            f = ri[k]
+
+            # columns before k only hold the diagonal, which is not read
+            for j in range(k + 1, width):
+                ri[j] = (pivot * ri[j] - f * rk[j]) // prev
+
+            ri[k] = 0
+
+        prev = pivot
+
+    return [[nums.backend.rational(x, prev) for x in row[n:]] for row in m]
+
+
+def _exact_solve(a: Matrix, b: Matrix) -> Matrix:
+    n = _square(a)
+
+    # scaling a row of [a | b] does not change the solution
+    rows, _ = _integer_rows([ra + rb for ra, rb in zip(a.rows(), b.rows())])
+    x = _bareiss_solve([row[:n] for row in rows], [row[n:] for row in rows])
+    return Matrix(EXACT, x, b.shape, vector=b.is_vector)
+
+
+def _matrix(expr: Union[Expr, Matrix]) -> Matrix:
+
+    if isinstance(expr, Matrix):
+        return expr
+
+    return Matrix.from_expr(expr)
+
+
+def dot(a: Expr, b: Expr) -> Expr:
+    """
+    Product of matrices and vectors, a vector on the left is a row.
+    """
+
+    a, b = _common(_matrix(a), _matrix(b))
+    left = a.transpose() if a.is_vector else a
+
+    if left.shape[1] != b.shape[0]:
+        raise MatrixError(f'shapes {a.shape} and {b.shape} do not match')
+
+    shape = (left.shape[0], b.shape[1])
+
+    if a.kind == MACHINE:
+        data = left._data @ b._data
+
+    elif a.kind == PRECISION:
+        with mpmath.workprec(a._prec):
+            data = left._data * b._data
+
+    else:
+        cols = list(zip(*b._data))
+        data = [[sum(x * y for x, y in zip(row, col)) for col in cols] for row in left._data]
+
+    product = Matrix(a.kind, data, shape, a._prec, b.is_vector and not a.is_vector)
+
+    if a.is_vector and b.is_vector:
+        return product.to_expr().leaves[0].leaves[0]
+
+    if a.is_vector:
+        return product.transpose(vector=True).to_expr()
+
+    return product.to_expr()
+
+
+def det(m: Expr) -> Number:
+    """
+    Determinant of a square matrix.
+    """
+
+    m = _matrix(m)
+    _square(m)
+
+    if m.kind == MACHINE:
+        import numpy
+        return MachineReal(numpy.linalg.det(m._data))
+
+    elif m.kind == PRECISION:
+        with mpmath.workprec(m._prec):
+            return _precision_number(mpmath.det(m._data), m._prec)
+
+    rows, scales = _integer_rows(m.rows())
+    return _exact_number(nums.backend.rational(_bareiss_det(rows), reduce(lambda x, y: x * y, scales, 1)))
+
+
+def linear_solve(m: Expr, b: Expr) -> Expr:
+    """
+    Solution x of m.x = b for a square non-singular matrix m, b is a
+    vector or a matrix.
+    """
+
+    m, b = _common(_matrix(m), _matrix(b))
+    n = _square(m)
+
+    if b.shape[0] != n:
+        raise MatrixError(f'shapes {m.shape} and {b.shape} do not match')
+
+    if m.kind == MACHINE:
+        import numpy
+
+        try:
+            data = numpy.linalg.solve(m._data, b._data)
+
+        except numpy.linalg.LinAlgError:
+            raise SingularMatrixError('matrix is singular') from None
+
+        return Matrix(MACHINE, data, b.shape, vector=b.is_vector).to_expr()
+
+    elif m.kind == PRECISION:
+
+        with mpmath.workprec(m._prec):
+
+            try:
+                # one column at a time, mpmath keeps the LU factors of m
+                data = mpmath.matrix(*b.shape)
+
+                for j in range(b.shape[1]):
+                    data[:, j] = mpmath.lu_solve(m._data, b._data.column(j))
+
+            except ZeroDivisionError:
+                raise SingularMatrixError('matrix is singular') from None
+
+        return Matrix(PRECISION, data, b.shape, m._prec, b.is_vector).to_expr()
+
+    return _exact_solve(m, b).to_expr()
+
+
+def inverse(m: Expr) -> Expr:
+    """
+    Inverse of a square non-singular matrix.
+    """
+
+    m = _matrix(m)
+    n = _square(m)
+
+    if m.kind == MACHINE:
+        import numpy
+
+        try:
+            return Matrix(MACHINE, numpy.linalg.inv(m._data), m.shape).to_expr()
+
+        except numpy.linalg.LinAlgError:
+            raise SingularMatrixError('matrix is singular') from None
+
+    elif m.kind == PRECISION:
+
+        with mpmath.workprec(m._prec):
+
+            try:
+                return Matrix(PRECISION, mpmath.inverse(m._data), m.shape, m._prec).to_expr()
+
+            except ZeroDivisionError:
+                raise SingularMatrixError('matrix is singular') from None
+
+    identity = [[int(i == j) for j in range(n)] for i in range(n)]
+    return _exact_solve(m, Matrix(EXACT, identity, m.shape)).to_expr()
+
+
+def eigenvalues(m: Expr) -> Expr:
+    """
+    Eigenvalues of a square matrix, by decreasing absolute value.
+    Exact matrices are solved at machine precision.
+    """
+
+    m = _matrix(m)
+    _square(m)
+
+    if m.kind == PRECISION:
+
+        with mpmath.workprec(m._prec):
+            values = mpmath.eig(m._data, left=False, right=False)
+            values = sorted(values, key=lambda x: -abs(x))
+            values = [x.real if isinstance(x, mpmath.mpc) and not x.imag else x for x in values]
+            return Expr(SymbolList, *(_precision_number(x, m._prec) for x in values))
+
+    import numpy
+
+    data = m.astype(MACHINE)._data
+
+    if (data == data.T).all():
+        # real spectrum, LAPACK has a faster routine for it
+        values = numpy.linalg.eigvalsh(data)
+
+    else:
+        values = numpy.linalg.eigvals(data)
+
+        if not values.imag.any():
+            values = values.real
+
+    values = values[numpy.argsort(-abs(values), kind='stable')]
+
+    if values.dtype == numpy.float64:
+        return _machine_rows(values.reshape(1, -1))[0]
+
+    return Expr(SymbolList, *(_machine_number(complex(x)) for x in values))
+
+
+__all__ = ['Matrix', 'MatrixError', 'SingularMatrixError', 'dot', 'det', 'inverse', 'linear_solve', 'eigenvalues']
@@ -0,0 +1,161 @@
+import sys
+
+from typing import Callable, Optional
+
+from .expression import Expr
+from .leaves import PackedLeaves
+
+
+class MemoryLimitError(MemoryError):
+    """
+    Raised when an allocation would exceed the budget of a MemoryTracker.
+    """
+
+
+def leaf_count(expr: Expr) -> int:
+    """
+    Total number of indivisible subexpressions in expr.
+    """
+
+    return expr.leaf_count
+
+
+def depth(expr: Expr) -> int:
+    """
+    Maximum number of indices needed to specify any part of expr, plus one.
+    """
+
+    return expr.depth
+
+
+def own_bytes(expr: Expr) -> int:
+    """
+    Bytes used by the node itself, excluding its head and leaves.
+    """
+
+    if expr.is_atom:
+        return expr.byte_count
+
+    return sys.getsizeof(expr) + sys.getsizeof(expr.leaves)
+
+
+def byte_count(expr: Expr) -> int:
+    """
+    Number of bytes used by expr, every distinct subexpression is counted
+    once no matter how many times it is referenced.
+
+    For a tree without shared subexpressions this is the same as the
+    cached `expr.byte_count`, which costs nothing to query.
+    """
+
+    # nodes are kept, so that the id of a leaf built on access is not
+    # reused by the next one
+    seen = {}
+    stack = [expr]
+    total = 0
+
+    while stack:
+        node = stack.pop()
+
+        if id(node) in seen:
+            continue
+
+        seen[id(node)] = node
+        total += own_bytes(node)
+
+        if not node.is_atom:
+            stack.append(node.head)
+
+            # packed numbers are part of the storage, see own_bytes
+            if not isinstance(node.leaves, PackedLeaves):
+                stack.extend(node.leaves)
+
+    return total
+
+
+class MemoryTracker(object):
+    """
+    Accounting of the expressions kept alive by a session.
+
+    An allocation is charged with the cached `expr.byte_count`, which
+    costs nothing to query but counts a shared subtree once per
+    reference. Allocating with `shared` charges the distinct nodes
+    instead, see `byte_count`, at the cost of a walk of the expression;
+    use it for expressions known to share subtrees, e.g. the result of
+    `mathx.core.share.share`. Nodes shared by different allocations are
+    charged for each of them. An expression allocated twice is charged
+    once. When an allocation would exceed the limit, `spill` is called
+    with the tracker and the number of bytes requested, it may release
+    (e.g. write to disk) some of the tracked expressions to make room.
+    If there is still not enough room the allocation is refused with
+    MemoryLimitError.
+    """
+
+    __slots__ = ['_limit', '_spill', '_tracked', '_used']
+
+    def __new__(cls, limit: int, spill: Optional[Callable[['MemoryTracker', int], None]] = None):
+        obj = super(MemoryTracker, cls).__new__(cls)
+        obj._limit = int(limit)
+        obj._spill = spill
+        # id of expression -> (expression, bytes charged)
+        obj._tracked = {}
+        obj._used = 0
+        return obj
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def used(self) -> int:
+        return self._used
+
+    @property
+    def available(self) -> int:
+        return self._limit - self._used
+
+    def allocate(self, expr: Expr, shared: bool = False) -> Expr:
+        """
+        Charge expr to the session, returns expr.
+        """
+
+        if id(expr) in self._tracked:
+            return expr
+
+        size = byte_count(expr) if shared else expr.byte_count
+
+        if size > self.available and self._spill is not None:
+            self._spill(self, size)
+
+        if size > self.available:
+            raise MemoryLimitError(f'allocation of {size} bytes exceeds the limit, '
+                                   f'{self.available} of {self._limit} bytes available')
+
+        self._tracked[id(expr)] = expr, size
+        self._used += size
+        return expr
+
+    def release(self, expr: Expr) -> int:
+        """
+        Stop tracking expr, returns the number of bytes it was charged.
+        """
+
+        _, size = self._tracked.pop(id(expr), (None, 0))
+        self._used -= size
+        return size
+
+    def __contains__(self, expr):
+        return id(expr) in self._tracked
+
+    def __iter__(self):
+        # oldest allocation first, that is the order to spill
+        return iter([expr for expr, _ in self._tracked.values()])
+
+    def __len__(self):
+        return len(self._tracked)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self._used}/{self._limit}>"
+
+
+__all__ = ['MemoryLimitError', 'MemoryTracker', 'leaf_count', 'depth', 'byte_count', 'own_bytes']
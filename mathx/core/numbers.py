@@ -1,13 +1,20 @@
 from sympy.core.numbers import Integer, Rational
 from .expression import AtomicExpr
 
+import sys
 import math
 import sympy
 import mpmath
+from fractions import Fraction
 from typing import Union
 
 from math import log
 
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
 C = log(10, 2)  # ~ 3.3219280948873626
 
 # Number of bits of machine precision
@@ -15,6 +22,94 @@ machine_precision = 53
 machine_epsilon = 2 ** (1 - machine_precision)
 
 
+class NumberBackend(object):
+    """
+    Types used to store the values of Integer and Rational.
+
+    Both types must interoperate with python int, and the rational type
+    must provide `numerator` and `denominator`.
+    """
+
+    __slots__ = ['_name', '_integer', '_rational']
+
+    def __new__(cls, name: str, integer: type, rational: type) -> 'NumberBackend':
+        obj = super(NumberBackend, cls).__new__(cls)
+        obj._name = name
+        obj._integer = integer
+        obj._rational = rational
+        return obj
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def integer(self, value):
+        if type(value) is self._integer:
+            return value
+
+        return self._integer(int(value))
+
+    def rational(self, numerator, denominator=1):
+        """
+        numerator / denominator, both can be anything sympy.Rational
+        accepts: int, rationals of any backend, float or str.
+        """
+        if type(numerator) is int and type(denominator) is int:
+            return self._rational(numerator, denominator)
+
+        if denominator == 1 and type(numerator) is self._rational:
+            return numerator
+
+        value = _fraction(numerator)
+
+        if denominator != 1:
+            value /= _fraction(denominator)
+
+        return self._rational(value.numerator, value.denominator)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self._name}>"
+
+
+def _fraction(value) -> Fraction:
+    """
+    Exact Fraction of value, floats are taken with all their binary digits.
+    """
+
+    # sympy numbers are converted through their exact integer parts
+    if isinstance(value, sympy.Basic):
+        value = sympy.Rational(value)
+        return Fraction(int(value.p), int(value.q))
+
+    return Fraction(value)
+
+
+_fraction_size = sys.getsizeof(Fraction(0))
+
+backends = {'python': NumberBackend('python', int, Fraction)}
+
+if gmpy2 is not None:
+    backends['gmpy2'] = NumberBackend('gmpy2', gmpy2.mpz, gmpy2.mpq)
+
+# gmpy2 is used when installed
+backend = backends.get('gmpy2', backends['python'])
+
+
+def set_backend(name: str) -> NumberBackend:
+    """
+    Select the backend of the Integer and Rational created from now on,
+    'python' or 'gmpy2'. Returns the previous backend.
+    """
+
+    global backend
+
+    if name not in backends:
+        raise ValueError(f'number backend {name!r} is not available, choose from {sorted(backends)}')
+
+    previous, backend = backend, backends[name]
+    return previous
+
+
 def dpsx(prec) -> int:
     """
     dps (short for decimal places) is the decimal precision
@@ -58,7 +153,7 @@ def roundx(number, dps=None) -> Union['PrecisionReal','MachineReal']:
     if dps is None:
 
         if isinstance(number, (Integer, Real, Rational)):
-            return MachineReal(float(number))
+            return MachineReal(float(to_python(number)))
 
         elif isinstance(number, Complex):
             real = roundx(number.real)
@@ -71,10 +166,10 @@ def roundx(number, dps=None) -> Union['PrecisionReal','MachineReal']:
     else:
 
         if isinstance(number, Integer): 
-            return PrecisionReal(sympy.Float(int(number), dps))
+            return PrecisionReal(sympy.Float(int(number._value), dps))
 
         elif isinstance(number, Rational):
-            return PrecisionReal(number.value.n(dps))
+            return PrecisionReal(to_sympy(number).n(dps))
 
         elif isinstance(number, MachineReal):
             return PrecisionReal(sympy.Float(float(number), dps))
@@ -101,29 +196,45 @@ class Number(AtomicExpr):
 
 class Integer(Number):
     """
-    Integer class, internal saved as int.
+    Integer class, internal saved as int of the number backend.
     """
 
     __slots__ = ['_value']
 
     def __new__(cls, value: int) -> 'Integer':
         obj = super(Integer, cls).__new__(cls)
-        obj._value = int(value)
+        obj._value = backend.integer(value)
         return obj
 
+    def _sizeof(self) -> int:
+        # gmpy2 recycles freed numbers along with their limbs, so the size
+        # of its values depends on what was freed before; they are
+        # measured as the python int of the same value instead
+        return sys.getsizeof(self) + sys.getsizeof(int(self._value))
+
 
 class Rational(Number):
     """
-    Rational class, internal saved as sympy.Rational
+    Rational class, internal saved as rational of the number backend.
     """
 
     __slots__ = ['_value']
 
     def __new__(cls, numerator, denominator=1) -> 'Rational':
         obj = super(Rational, cls).__new__(cls)
-        obj._value = sympy.Rational(numerator, denominator)
+        obj._value = backend.rational(numerator, denominator)
         return obj
 
+    def _measure(self):
+        super(Rational, self)._measure()
+        self._leaf_count = 3  # Rational[p, q]
+
+    def _sizeof(self) -> int:
+        # measured as the equivalent Fraction, see Integer._sizeof
+        value = self._value
+        return (sys.getsizeof(self) + _fraction_size +
+                sys.getsizeof(int(value.numerator)) + sys.getsizeof(int(value.denominator)))
+
 
 
 class Real(Number):
@@ -205,6 +316,10 @@ class PrecisionReal(Real):
         obj._value = sympy.Float(value)
         return obj
 
+    def _sizeof(self) -> int:
+        # mantissa is the only part growing with the precision
+        return sys.getsizeof(self) + sys.getsizeof(self._value._mpf_[1])
+
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self._value}>"
 
@@ -243,6 +358,13 @@ class Complex(Number):
         self._imag = imag
         return self
 
+    def _measure(self):
+        super(Complex, self)._measure()
+        self._leaf_count = 3  # Complex[real, imag]
+
+    def _sizeof(self) -> int:
+        return sys.getsizeof(self) + self._real.byte_count + self._imag.byte_count
+
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self._real, self._imag}>"
 
@@ -253,10 +375,10 @@ def to_sympy(number: Number) -> sympy.Number:
     """
 
     if isinstance(number, Integer):
-        return sympy.Integer(number._value)
+        return sympy.Integer(int(number._value))
 
     elif isinstance(number, Rational):
-        return number._value
+        return sympy.Rational(int(number._value.numerator), int(number._value.denominator))
 
     elif isinstance(number, MachineReal):
         return sympy.Float(number._value)
@@ -274,7 +396,7 @@ def to_python(number: Number) -> [float,int,complex]:
     """
 
     if isinstance(number, Integer):
-        return number._value
+        return int(number._value)
 
     elif isinstance(number, Rational):
         return float(number._value)
@@ -297,5 +419,5 @@ Integer1 = Integer(1)
 
 __all__ = ['precision', 'roundx', 'Number', 'Integer', 'Real', 'MachineReal', 
            'PrecisionReal', 'Complex', 'Integer0', 'Integer1', 'machine_precision', 'C',
-           'Rational'
+           'Rational', 'NumberBackend', 'backends', 'set_backend'
           ]
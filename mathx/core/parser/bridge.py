@@ -3,14 +3,22 @@
 
 import sympy
 
-from math import ceil, log10
-from typing import Tuple, Union
+from array import array
+from functools import lru_cache
+from math import ceil, isfinite, log10
+from typing import List, Tuple, Union
 from mathics_parser.ast import Symbol, String, Number, Filename
+from mpmath import libmp
 
 import mathx.core.string
 from .. import expression as expr
 from .. import numbers as nums
-from ..numbers import machine_precision, C
+from ..leaves import PackedLeaves
+from ..numbers import machine_precision, precx, C
+from ..share import ShareTable
+
+# Minimal number of sibling literals decoded as a packed buffer
+PACKED_THRESHOLD = 16
 
 
 def reconstruct_digits(bits) -> int:
@@ -23,6 +31,28 @@ def reconstruct_digits(bits) -> int:
     return int(ceil(bits / C) + 1)
 
 
+machine_digits = reconstruct_digits(machine_precision)
+
+
+@lru_cache(maxsize=1024)
+def accuracy10(acc, base: int) -> float:
+    """
+    Decimal digits of acc digits in base.
+    """
+    return acc * log10(base)
+
+
+def ratio_float(p: int, q: int) -> float:
+    """
+    Correctly rounded float of p / q, python's int division is exact.
+    """
+    try:
+        return p / q
+
+    except OverflowError:
+        return float("inf") if (p < 0) == (q < 0) else float("-inf")
+
+
 def string_escape(s: str) -> str:
     s = s.replace("\\\\", "\\").replace('\\"', '"')
     s = s.replace("\\r\\n", "\r\n")
@@ -105,7 +135,7 @@ def convert_Number(node: Number) -> Union[Tuple[str, int, int],
             # in the mantissa
             d = len(man) - 2  # one less for decimal point
 
-            if d < reconstruct_digits(machine_precision):
+            if d < machine_digits:
                 return "MachineReal", sign * float(s)
 
             else:
@@ -162,12 +192,11 @@ def convert_Number(node: Number) -> Union[Tuple[str, int, int],
         q = base ** -n
 
     result = "Rational", p, q
-    x = float(sympy.Rational(p, q))
+    x = ratio_float(p, q)
 
     # determine `prec10` the digits of precision in base 10
     if suffix is None:
-        acc = len(s[1])
-        acc10 = acc * log10(base)
+        acc10 = accuracy10(len(s[1]), base)
 
         if x == 0:
             prec10 = acc10
@@ -175,15 +204,14 @@ def convert_Number(node: Number) -> Union[Tuple[str, int, int],
         else:
             prec10 = acc10 + log10(abs(x))
 
-        if prec10 < reconstruct_digits(machine_precision):
+        if prec10 < machine_digits:
             prec10 = None
 
     elif suffix == "":
         prec10 = None
 
     elif suffix.startswith("`"):
-        acc = float(suffix[1:])
-        acc10 = acc * log10(base)
+        acc10 = accuracy10(float(suffix[1:]), base)
 
         if x == 0:
             prec10 = acc10
@@ -192,8 +220,7 @@ def convert_Number(node: Number) -> Union[Tuple[str, int, int],
             prec10 = acc10 + log10(abs(x))
 
     else:
-        prec = float(suffix)
-        prec10 = prec * log10(base)
+        prec10 = accuracy10(float(suffix), base)
 
     if prec10 is None:
         return "MachineReal", x
@@ -202,6 +229,54 @@ def convert_Number(node: Number) -> Union[Tuple[str, int, int],
         return "PrecisionReal", result, prec10
 
 
+def convert_Number_run(nodes: List[Number]) -> Union[Tuple[str, str, array], None]:
+    """
+    Decode sibling literals straight into a packed int64 ('q') or
+    float64 ('d') buffer. Returns None unless all of them are decimal
+    integers fitting in int64, or all machine reals.
+    """
+
+    typecode = None
+    values = []
+
+    for node in nodes:
+        s = node.value
+        suffix = node.suffix
+        n = node.exp
+
+        if node.base != 10:
+            return None
+
+        if "." not in s and suffix is None and n >= 0:
+            kind = "q"
+            value = node.sign * int(s) * 10 ** n
+
+        elif suffix == "" or (suffix is None and "." in s and len(s) - 2 < machine_digits):
+            kind = "d"
+            value = node.sign * float(s + "E" + str(n) if n != 0 else s)
+
+            # overflows are reported by the literal alone
+            if not isfinite(value):
+                return None
+
+        else:
+            return None
+
+        if typecode is None:
+            typecode = kind
+
+        elif kind != typecode:
+            return None
+
+        values.append(value)
+
+    try:
+        return "PackedArray", typecode, array(typecode, values)
+
+    except OverflowError:
+        return None
+
+
 def make_Symbol(s):
     return expr.Symbol(s)
 
@@ -223,24 +298,36 @@ def make_MachineReal(x):
 
 
 def make_PrecisionReal(value, prec):
+    # Rounded straight to binary with mpmath, same as sympy.Float(x, prec)
+    # but without parsing the number again.
+    bits = precx(prec)
+
     if value[0] == "Rational":
         assert len(value) == 3
-        x = sympy.Rational(*value[1:])
+        mpf = libmp.from_rational(value[1], value[2], bits, libmp.round_nearest)
 
     elif value[0] == "DecimalString":
         assert len(value) == 2
-        x = value[1]
+        mpf = libmp.from_str(value[1], bits, libmp.round_nearest)
 
     else:
         assert False
 
-    return nums.PrecisionReal(sympy.Float(x, prec))
+    # sympy.Float._new turns a zero mantissa into S.Zero, dropping the precision
+    if mpf == libmp.fzero:
+        return nums.PrecisionReal(sympy.Float(0, precision=bits))
+
+    return nums.PrecisionReal(sympy.Float._new(mpf, bits))
 
 
 def make_Expression(head, children):
     return expr.Expr(head, *children)
 
 
+def make_PackedArray(typecode, values):
+    return PackedLeaves(values, nums.MachineReal if typecode == "d" else nums.Integer)
+
+
 def do_convert(node):
 
     if isinstance(node, Symbol):
@@ -257,25 +344,68 @@ def do_convert(node):
 
     else:
         head = do_convert(node.head)
-        children = [do_convert(child) for child in node.children]
-        return "Expression", head, children
+        children = node.children
 
+        if len(children) >= PACKED_THRESHOLD and all(isinstance(child, Number) for child in children):
+            packed = convert_Number_run(children)
 
-def convert(node, definitions):
+            if packed is not None:
+                return "Expression", head, packed
 
-    assert hasattr(definitions, 'lookup_symbol_name')
+        return "Expression", head, [do_convert(child) for child in children]
 
-    result = do_convert(node)
+
+def make(result, definitions, table=None):
+    """
+    Build the expression of a converted node, every node is replaced by
+    its canonical instance in table when given.
+    """
 
     if result[0] == "Lookup":
         value = definitions.lookup_symbol_name(*result[1:])
-        return expr.Symbol(value)
-        
+        node = expr.Symbol(value)
+
+    elif result[0] == "Expression":
+        head = make(result[1], definitions, table)
+        children = result[2]
+
+        if isinstance(children, tuple):  # PackedArray
+            node = expr.Expr.from_leaves(head, make(children, definitions))
+
+        else:
+            node = make_Expression(head, [make(child, definitions, table) for child in children])
+
     else:
-        return globals()["make_" + result[0]](*result[1:])
+        node = globals()["make_" + result[0]](*result[1:])
+
+    if table is not None and isinstance(node, expr.Expr):
+        node = table.intern(node)
+
+    return node
+
+
+def convert(node, definitions):
+    """
+    Convert ast node to expression.
+    """
+
+    assert hasattr(definitions, 'lookup_symbol_name')
+    return make(do_convert(node), definitions)
+
+
+def convert_shared(node, definitions) -> Tuple[expr.Expr, int]:
+    """
+    Convert ast node to expression, identical subexpressions are built
+    as a single instance. The result is the expression and the number
+    of bytes saved, as for `share.share`.
+    """
+
+    assert hasattr(definitions, 'lookup_symbol_name')
+    table = ShareTable()
+    return make(do_convert(node), definitions, table), table.saved
 
 
 # Exported functions or classes, do not use any other function if you
 # know what you are doing.
 
-__all__ = ['convert']
+__all__ = ['convert', 'convert_shared']
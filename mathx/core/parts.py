@@ -0,0 +1,134 @@
+from typing import Tuple, Union
+
+from .expression import Expr
+from .leaves import CHUNK, LeafVector
+
+
+def _storage(leaves) -> Union[tuple, LeafVector]:
+    """
+    Small leaves are copied as tuple, large ones go to a LeafVector so
+    that further updates share the unchanged chunks.
+    """
+
+    if isinstance(leaves, tuple) and len(leaves) < CHUNK:
+        return leaves
+
+    return LeafVector(leaves)
+
+
+def _result(expr: Expr, leaves) -> Expr:
+
+    if isinstance(leaves, LeafVector) and len(leaves) <= CHUNK:
+        leaves = tuple(leaves)
+
+    return Expr.from_leaves(expr.head, leaves)
+
+
+def _index(i: int, n: int) -> int:
+    """
+    Zero based index of the 1-based (or negative from the end) part i.
+    """
+
+    k = i - 1 if i > 0 else n + i
+
+    if i == 0 or not 0 <= k < n:
+        raise IndexError(f'part {i} of expression with {n} leaves does not exist')
+
+    return k
+
+
+def replace_part(expr: Expr, i: int, new: Expr) -> Expr:
+    """
+    Copy of expr with its i-th part replaced by new, part 0 is the head.
+    """
+
+    if i == 0:
+        return Expr.from_leaves(new, expr.leaves)
+
+    leaves = _storage(expr.leaves)
+    k = _index(i, len(leaves))
+
+    if isinstance(leaves, tuple):
+        return _result(expr, leaves[:k] + (new,) + leaves[k + 1:])
+
+    else:
+        return _result(expr, leaves.set(k, new))
+
+
+def append(expr: Expr, new: Expr) -> Expr:
+    """
+    Copy of expr with new added as the last leaf.
+    """
+
+    leaves = _storage(expr.leaves)
+
+    if isinstance(leaves, tuple):
+        return _result(expr, leaves + (new,))
+
+    else:
+        return _result(expr, leaves.append(new))
+
+
+def _span(spec: Union[int, Tuple[int, int]], n: int) -> Tuple[int, int]:
+    """
+    Zero based [start, stop) of a sequence specification, n for the
+    first n leaves, -n for the last n and (m, n) for leaves m through n.
+    """
+
+    if isinstance(spec, int):
+
+        if abs(spec) > n:
+            raise IndexError(f'cannot take {spec} leaves of expression with {n} leaves')
+
+        return (0, spec) if spec >= 0 else (n + spec, n)
+
+    m, k = spec
+    start = m - 1 if m > 0 else n + m
+    stop = k if k >= 0 else n + k + 1
+
+    if m == 0 or not 0 <= start <= stop <= n:
+        raise IndexError(f'cannot take leaves {m} through {k} of expression with {n} leaves')
+
+    return start, stop
+
+
+def take(expr: Expr, spec: Union[int, Tuple[int, int]]) -> Expr:
+    """
+    Expression with the leaves of expr given by spec, see `_span`.
+    """
+
+    leaves = _storage(expr.leaves)
+    start, stop = _span(spec, len(leaves))
+
+    if isinstance(leaves, tuple):
+        return _result(expr, leaves[start:stop])
+
+    else:
+        return _result(expr, leaves.drop(start).take(stop - start))
+
+
+def drop(expr: Expr, spec: Union[int, Tuple[int, int]]) -> Expr:
+    """
+    Expression with the leaves of expr given by spec removed, see `_span`.
+
+    Dropping from the middle of a large expression copies the remaining
+    leaves, the ends are dropped in O(log n).
+    """
+
+    leaves = _storage(expr.leaves)
+    start, stop = _span(spec, len(leaves))
+
+    if isinstance(leaves, tuple):
+        return _result(expr, leaves[:start] + leaves[stop:])
+
+    elif start == 0:
+        return _result(expr, leaves.drop(stop))
+
+    elif stop == len(leaves):
+        return _result(expr, leaves.take(start))
+
+    else:
+        return _result(expr, LeafVector(tuple(leaves.take(start)) + tuple(leaves.drop(stop))))
+
+
+__all__ = ['replace_part', 'append', 'take', 'drop']
@@ -0,0 +1,766 @@
+"""
+Polynomials with rational coefficients.
+
+`Poly` keeps a sparse dict from exponent tuples to coefficients over a
+fixed tuple of generator symbols. Coefficients are python `int` and
+`fractions.Fraction`, which is a lot cheaper than going through sympy.
+Large dense products go through a dense coefficient form instead:
+Kronecker substitution makes them univariate, then they are multiplied
+with an FFT when the result is exactly representable in float64, and
+as big integers otherwise.
+"""
+
+from fractions import Fraction
+from functools import reduce
+from math import gcd as igcd, isqrt, lcm
+from typing import Dict, Sequence, Tuple, Union
+
+from .expression import Expr, Symbol
+from .numbers import Integer, Rational, Integer0
+
+Coefficient = Union[int, Fraction]
+Monomial = Tuple[int, ...]
+
+SymbolPlus = Symbol('Plus')
+SymbolTimes = Symbol('Times')
+SymbolPower = Symbol('Power')
+
+# Number of terms of both factors from which the dense product is tried
+DENSE_THRESHOLD = 1024
+
+# Largest coefficient bound of an FFT product, to be exact in float64
+FFT_BOUND = 2 ** 40
+
+# Evaluation points tried by the heuristic gcd before it gives up
+HEURISTIC_GCD_ATTEMPTS = 6
+
+
+class PolynomialError(ValueError):
+    """
+    Raised when an expression is not a polynomial.
+    """
+
+
+def _normalize(c: Coefficient) -> Coefficient:
+
+    if isinstance(c, Fraction) and c.denominator == 1:
+        return c.numerator
+
+    return c
+
+
+class Poly(object):
+    """
+    Sparse multivariate polynomial over the rationals.
+    """
+
+    __slots__ = ['_terms', '_gens']
+
+    def __new__(cls, terms: Dict[Monomial, Coefficient], gens: Sequence[Symbol]) -> 'Poly':
+        obj = super(Poly, cls).__new__(cls)
+        obj._terms = {m: c for m, c in terms.items() if c}
+        obj._gens = tuple(gens)
+        return obj
+
+    @classmethod
+    def _new(cls, terms: Dict[Monomial, Coefficient], gens: tuple) -> 'Poly':
+        # terms are already free of zeros
+        obj = super(Poly, cls).__new__(cls)
+        obj._terms = terms
+        obj._gens = gens
+        return obj
+
+    @classmethod
+    def constant(cls, c: Coefficient, gens: Sequence[Symbol]) -> 'Poly':
+        gens = tuple(gens)
+        return cls({(0,) * len(gens): c}, gens)
+
+    @classmethod
+    def generator(cls, i: int, gens: Sequence[Symbol]) -> 'Poly':
+        gens = tuple(gens)
+        return cls._new({tuple(int(j == i) for j in range(len(gens))): 1}, gens)
+
+    @property
+    def terms(self) -> Dict[Monomial, Coefficient]:
+        return self._terms
+
+    @property
+    def gens(self) -> Tuple[Symbol, ...]:
+        return self._gens
+
+    @property
+    def is_zero(self) -> bool:
+        return not self._terms
+
+    def __len__(self):
+        return len(self._terms)
+
+    def degree(self, i: int = 0) -> int:
+        """
+        Degree in the i-th generator, -1 for the zero polynomial.
+        """
+        return max((m[i] for m in self._terms), default=-1)
+
+    def total_degree(self) -> int:
+        return max((sum(m) for m in self._terms), default=-1)
+
+    def leading_term(self) -> Tuple[Monomial, Coefficient]:
+        """
+        Leading term in lexicographic order of the generators.
+        """
+        m = max(self._terms)
+        return m, self._terms[m]
+
+    def coefficients_in(self, i: int) -> Dict[int, 'Poly']:
+        """
+        Coefficients of the powers of the i-th generator, as polynomials
+        free of it.
+        """
+        coefficients = {}
+
+        for m, c in self._terms.items():
+            coefficients.setdefault(m[i], {})[m[:i] + (0,) + m[i + 1:]] = c
+
+        return {k: Poly._new(terms, self._gens) for k, terms in coefficients.items()}
+
+    def reorder(self, gens: Sequence[Symbol]) -> 'Poly':
+        """
+        Same polynomial over gens, which must contain all generators
+        it depends on.
+        """
+        gens = tuple(gens)
+
+        if gens == self._gens:
+            return self
+
+        index = {g: i for i, g in enumerate(gens)}
+        terms = {}
+
+        for m, c in self._terms.items():
+            n = [0] * len(gens)
+
+            for g, e in zip(self._gens, m):
+
+                if e:
+
+                    if g not in index:
+                        raise PolynomialError(f'{g} is not one of the generators')
+
+                    n[index[g]] = e
+
+            terms[tuple(n)] = c
+
+        return Poly._new(terms, gens)
+
+    def _unify(self, other) -> Tuple['Poly', 'Poly']:
+
+        if not isinstance(other, Poly):
+            return self, Poly.constant(other, self._gens)
+
+        if other._gens == self._gens:
+            return self, other
+
+        gens = tuple(sorted(set(self._gens) | set(other._gens), key=lambda g: g.fullname))
+        return self.reorder(gens), other.reorder(gens)
+
+    def __add__(self, other) -> 'Poly':
+        a, b = self._unify(other)
+        terms = dict(a._terms)
+
+        for m, c in b._terms.items():
+            c = terms.get(m, 0) + c
+
+            if c:
+                terms[m] = c
+
+            else:
+                del terms[m]
+
+        return Poly._new(terms, a._gens)
+
+    __radd__ = __add__
+
+    def __neg__(self) -> 'Poly':
+        return Poly._new({m: -c for m, c in self._terms.items()}, self._gens)
+
+    def __sub__(self, other) -> 'Poly':
+        return self + (-other)
+
+    def __rsub__(self, other) -> 'Poly':
+        return -self + other
+
+    def __mul__(self, other) -> 'Poly':
+
+        if not isinstance(other, Poly):
+
+            if not other:
+                return Poly._new({}, self._gens)
+
+            return Poly._new({m: c * other for m, c in self._terms.items()}, self._gens)
+
+        a, b = self._unify(other)
+
+        if len(a) * len(b) >= DENSE_THRESHOLD:
+            product = _dense_mul(a, b)
+
+            if product is not None:
+                return product
+
+        terms = {}
+
+        for ma, ca in a._terms.items():
+
+            for mb, cb in b._terms.items():
+                m = tuple(x + y for x, y in zip(ma, mb))
+                terms[m] = terms.get(m, 0) + ca * cb
+
+        return Poly(terms, a._gens)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, n: int) -> 'Poly':
+
+        if not isinstance(n, int) or n < 0:
+            raise PolynomialError(f'cannot raise polynomial to power {n}')
+
+        result = Poly.constant(1, self._gens)
+        base = self
+
+        while n:
+
+            if n & 1:
+                result = result * base
+
+            n >>= 1
+
+            if n:
+                base = base * base
+
+        return result
+
+    def __eq__(self, other):
+
+        if not isinstance(other, Poly):
+            return self._terms == Poly.constant(other, self._gens)._terms
+
+        a, b = self._unify(other)
+        return a._terms == b._terms
+
+    def __hash__(self):
+        return hash((self._gens, frozenset(self._terms.items())))
+
+    def exquo(self, other: 'Poly') -> 'Poly':
+        """
+        Exact quotient of the division by other, raises PolynomialError
+        when other does not divide self.
+        """
+        a, b = self._unify(other)
+
+        if b.is_zero:
+            raise ZeroDivisionError('polynomial division by zero')
+
+        mb, cb = b.leading_term()
+        quotient = {}
+        remainder = a
+
+        while not remainder.is_zero:
+            mr, cr = remainder.leading_term()
+            m = tuple(x - y for x, y in zip(mr, mb))
+
+            if min(m) < 0:
+                raise PolynomialError('division is not exact')
+
+            # integer arithmetic as long as the division is exact
+            c = cr // cb if isinstance(cr, int) and isinstance(cb, int) and not cr % cb else Fraction(cr) / cb
+            quotient[m] = c
+            remainder = remainder - Poly._new({n: c * d for n, d in _shift(b._terms, m).items()}, a._gens)
+
+        return Poly(quotient, a._gens)
+
+    def monic(self) -> 'Poly':
+        """
+        Polynomial divided by its leading coefficient.
+        """
+        if self.is_zero:
+            return self
+
+        _, c = self.leading_term()
+        return Poly._new({m: _normalize(Fraction(d) / c) for m, d in self._terms.items()}, self._gens)
+
+    def primitive(self) -> 'Poly':
+        """
+        Polynomial with coprime integer coefficients and positive
+        leading coefficient, the same up to a rational factor.
+        """
+        if self.is_zero:
+            return self
+
+        denominator = reduce(lambda x, y: x * y // igcd(x, y), (Fraction(c).denominator for c in self._terms.values()))
+        terms = {m: int(c * denominator) for m, c in self._terms.items()}
+        content = reduce(igcd, terms.values())
+
+        if terms[max(terms)] < 0:
+            content = -content
+
+        return Poly._new({m: c // content for m, c in terms.items()}, self._gens)
+
+    def gcd(self, other: 'Poly') -> 'Poly':
+        """
+        Greatest common divisor, as primitive polynomial.
+        """
+        a, b = self._unify(other)
+        h = _heuristic_gcd(a.primitive(), b.primitive(), 0)
+
+        if h is None:
+            h = _gcd(a, b, 0)
+
+        return h.primitive()
+
+    def to_dense(self):
+        """
+        Coefficients as NumPy array, the k-th axis is indexed by the
+        power of the k-th generator.
+        """
+        import numpy
+
+        shape = tuple(self.degree(i) + 1 for i in range(len(self._gens))) if self._terms else (0,) * len(self._gens)
+        values = [_normalize(c) for c in self._terms.values()]
+        dtype = numpy.int64 if all(isinstance(c, int) and -2 ** 63 <= c < 2 ** 63 for c in values) else object
+        array = numpy.zeros(shape, dtype=dtype)
+
+        for m, c in zip(self._terms, values):
+            array[m] = c
+
+        return array
+
+    @classmethod
+    def from_dense(cls, array, gens: Sequence[Symbol]) -> 'Poly':
+        """
+        Polynomial from the NumPy coefficients given by `to_dense`.
+        """
+        import numpy
+
+        gens = tuple(gens)
+        terms = {}
+
+        for m in zip(*numpy.nonzero(array)):
+            c = array[m]
+            terms[tuple(int(e) for e in m)] = c if isinstance(c, Fraction) else int(c)
+
+        return cls(terms, gens)
+
+    @classmethod
+    def from_expr(cls, expr: Expr, gens: Sequence[Symbol] = None) -> 'Poly':
+        """
+        Polynomial of an expression made of Plus, Times and Power with
+        non-negative Integer exponent of symbols and Integer/Rational
+        numbers. The generators are all its symbols unless given.
+        """
+        if gens is None:
+            gens = sorted(_symbols(expr), key=lambda g: g.fullname)
+
+        gens = tuple(gens)
+        return _from_expr(expr, gens, {g: i for i, g in enumerate(gens)})
+
+    def to_expr(self) -> Expr:
+        """
+        Canonical expression of the polynomial, terms by increasing
+        total degree.
+        """
+        terms = [_term_expr(c, m, self._gens) for m, c in sorted(self._terms.items(), key=_term_order)]
+
+        if not terms:
+            return Integer0
+
+        elif len(terms) == 1:
+            return terms[0]
+
+        else:
+            return Expr(SymbolPlus, *terms)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)} terms in {', '.join(str(g) for g in self._gens)}>"
+
+
+def _shift(terms: Dict[Monomial, Coefficient], m: Monomial) -> Dict[Monomial, Coefficient]:
+    return {tuple(x + y for x, y in zip(n, m)): c for n, c in terms.items()}
+
+
+def _term_order(term):
+    m, _ = term
+    return sum(m), tuple(-e for e in m)
+
+
+def _coefficient_expr(c: Coefficient) -> Expr:
+    c = _normalize(c)
+
+    if isinstance(c, Fraction):
+        return Rational(c.numerator, c.denominator)
+
+    return Integer(c)
+
+
+def _term_expr(c: Coefficient, m: Monomial, gens: tuple) -> Expr:
+    factors = [g if e == 1 else Expr(SymbolPower, g, Integer(e)) for g, e in zip(gens, m) if e]
+
+    if not factors:
+        return _coefficient_expr(c)
+
+    if c != 1:
+        factors.insert(0, _coefficient_expr(c))
+
+    if len(factors) == 1:
+        return factors[0]
+
+    return Expr(SymbolTimes, *factors)
+
+
+def _symbols(expr: Expr) -> set:
+    symbols = set()
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+
+        if isinstance(node, Symbol):
+            symbols.add(node)
+
+        elif not node.is_atom:
+            stack.extend(node.leaves)
+
+    return symbols
+
+
+def _from_expr(expr: Expr, gens: tuple, index: Dict[Symbol, int]) -> Poly:
+
+    if isinstance(expr, Symbol):
+
+        if expr not in index:
+            raise PolynomialError(f'{expr} is not one of the generators')
+
+        return Poly.generator(index[expr], gens)
+
+    elif isinstance(expr, Integer):
+        return Poly.constant(int(expr._value), gens)
+
+    elif isinstance(expr, Rational):
+        value = expr._value
+        return Poly.constant(Fraction(int(value.numerator), int(value.denominator)), gens)
+
+    elif expr.is_atom:
+        raise PolynomialError(f'{expr!r} is not a polynomial')
+
+    head = expr.head
+
+    if head is SymbolPlus:
+        return reduce(lambda a, b: a + b, (_from_expr(leaf, gens, index) for leaf in expr.leaves),
+                      Poly.constant(0, gens))
+
+    elif head is SymbolTimes:
+        return reduce(lambda a, b: a * b, (_from_expr(leaf, gens, index) for leaf in expr.leaves),
+                      Poly.constant(1, gens))
+
+    elif head is SymbolPower and len(expr.leaves) == 2:
+        base, exponent = expr.leaves
+
+        if isinstance(exponent, Integer) and exponent._value >= 0:
+            return _from_expr(base, gens, index) ** int(exponent._value)
+
+    raise PolynomialError(f'{expr!r} is not a polynomial')
+
+
+def _kronecker(a: list, b: list) -> list:
+    """
+    Exact product of integer coefficient lists, lowest power first.
+
+    The lists are packed into the digits of two big integers, whose
+    product (Karatsuba and beyond, in C) holds the coefficients of the
+    result. Every digit has room for the largest possible coefficient
+    and a sign bit.
+    """
+
+    bound = max(map(abs, a)) * max(map(abs, b)) * min(len(a), len(b))
+    width = bound.bit_length() // 8 + 1
+    half = 1 << (8 * width - 1)
+    digit = half.to_bytes(width, 'little')
+
+    def pack(p: list) -> int:
+        # digits are offset by half to be non-negative, then shifted back
+        data = b''.join((c + half).to_bytes(width, 'little') for c in p)
+        return int.from_bytes(data, 'little') - int.from_bytes(digit * len(p), 'little')
+
+    n = len(a) + len(b) - 1
+    product = pack(a) * pack(b) + int.from_bytes(digit * n, 'little')
+    data = product.to_bytes(n * width, 'little')
+    return [int.from_bytes(data[i:i + width], 'little') - half for i in range(0, n * width, width)]
+
+
+def _fft(a: list, b: list):
+    """
+    Exact product of integer coefficient lists with NumPy's FFT, None
+    when NumPy is missing or the coefficients are too large.
+    """
+
+    try:
+        import numpy
+
+    except ImportError:
+        return None
+
+    if max(map(abs, a)) * max(map(abs, b)) * min(len(a), len(b)) >= FFT_BOUND:
+        return None
+
+    n = len(a) + len(b) - 1
+    size = 1 << (n - 1).bit_length()
+    fa = numpy.fft.rfft(numpy.array(a, dtype=numpy.float64), size)
+    fb = numpy.fft.rfft(numpy.array(b, dtype=numpy.float64), size)
+    product = numpy.rint(numpy.fft.irfft(fa * fb, size)[:n])
+    return [int(c) for c in product]
+
+
+def _dense_mul(a: Poly, b: Poly) -> Union[Poly, None]:
+    """
+    Product through Kronecker substitution into a univariate dense
+    product, None when the result would be too sparse for it to pay.
+    """
+
+    bases = [a.degree(i) + b.degree(i) + 1 for i in range(len(a.gens))]
+    strides = []
+    size = 1
+
+    for base in bases:
+        strides.append(size)
+        size *= base
+
+    if size > 16 * (len(a) + len(b)):
+        return None
+
+    def pack(p: Poly) -> Tuple[list, int]:
+        # integer coefficients over their common denominator
+        denominator = reduce(lcm, (c.denominator for c in p.terms.values() if isinstance(c, Fraction)), 1)
+        packed = {sum(e * s for e, s in zip(m, strides)): c for m, c in p.terms.items()}
+        dense = [0] * (max(packed) + 1)
+
+        for k, c in packed.items():
+            dense[k] = int(c * denominator)
+
+        return dense, denominator
+
+    (da, qa), (db, qb) = pack(a), pack(b)
+    product = _fft(da, db)
+
+    if product is None:
+        product = _kronecker(da, db)
+
+    denominator = qa * qb
+    terms = {}
+
+    for k, c in enumerate(product):
+
+        if c:
+            m = []
+
+            for base in bases:
+                k, e = divmod(k, base)
+                m.append(e)
+
+            terms[tuple(m)] = c if denominator == 1 else _normalize(Fraction(c, denominator))
+
+    return Poly._new(terms, a.gens)
+
+
+def _content(p: Poly, i: int) -> Poly:
+    """
+    Primitive gcd of the coefficients of p in the i-th generator.
+    """
+
+    return reduce(lambda x, y: _gcd(x, y, i + 1), p.coefficients_in(i).values())
+
+
+def _pseudo_remainder(a: Poly, b: Poly, i: int) -> Poly:
+    db = b.degree(i)
+    lc = b.coefficients_in(i)[db]
+    x = Poly.generator(i, a.gens)
+
+    while not a.is_zero and a.degree(i) >= db:
+        da = a.degree(i)
+        a = a * lc - a.coefficients_in(i)[da] * b * x ** (da - db)
+
+    return a
+
+
+def _gcd(a: Poly, b: Poly, i: int) -> Poly:
+    """
+    Primitive gcd of a and b, which depend only on the generators from i
+    on. Primitive rather than monic keeps the coefficients integers.
+    """
+
+    if a.is_zero:
+        return b.primitive()
+
+    if b.is_zero:
+        return a.primitive()
+
+    if i == len(a.gens):
+        return Poly.constant(1, a.gens)
+
+    if a.degree(i) == 0 and b.degree(i) == 0:
+        return _gcd(a, b, i + 1)
+
+    ca, cb = _content(a, i), _content(b, i)
+    a, b = a.exquo(ca), b.exquo(cb)
+
+    if a.degree(i) < b.degree(i):
+        a, b = b, a
+
+    while not b.is_zero:
+        r = _pseudo_remainder(a, b, i)
+        a, b = b, (r if r.is_zero else r.exquo(_content(r, i)))
+
+    return (a * _gcd(ca, cb, i + 1)).primitive()
+
+
+def _evaluate(p: Poly, i: int, x: int) -> Poly:
+    """
+    p with the i-th generator replaced by the integer x.
+    """
+
+    terms = {}
+
+    for m, c in p.terms.items():
+        n = m[:i] + (0,) + m[i + 1:]
+        terms[n] = terms.get(n, 0) + c * x ** m[i]
+
+    return Poly(terms, p.gens)
+
+
+def _interpolate(h: Poly, i: int, x: int) -> Poly:
+    """
+    Polynomial in the i-th generator whose coefficients are the digits in
+    base x of the integer coefficients of h, in symmetric representation.
+    """
+
+    terms = {}
+    half = x // 2
+    k = 0
+
+    while h.terms:
+        rest = {}
+
+        for m, c in h.terms.items():
+            d = c % x
+
+            if d > half:
+                d -= x
+
+            if d:
+                terms[m[:i] + (k,) + m[i + 1:]] = d
+
+            if c != d:
+                rest[m] = (c - d) // x
+
+        h = Poly._new(rest, h.gens)
+        k += 1
+
+    return Poly._new(terms, h.gens)
+
+
+def _heuristic_gcd(a: Poly, b: Poly, i: int) -> Union[Poly, None]:
+    """
+    Gcd of integer polynomials a and b, which depend only on the
+    generators from i on, or None when it is not found.
+
+    The i-th generator is evaluated at a large integer x, the gcd of the
+    values is computed recursively, and its digits in base x give a
+    candidate kept when it divides a and b. This is the heuristic gcd of
+    Char, Geddes and Gonnet, in integer arithmetic all along.
+    """
+
+    if a.is_zero:
+        return b
+
+    if b.is_zero:
+        return a
+
+    content = igcd(reduce(igcd, a.terms.values()), reduce(igcd, b.terms.values()))
+
+    if i == len(a.gens):
+        return Poly.constant(content, a.gens)
+
+    a = Poly._new({m: c // content for m, c in a.terms.items()}, a.gens)
+    b = Poly._new({m: c // content for m, c in b.terms.items()}, b.gens)
+    x = 2 * min(max(map(abs, a.terms.values())), max(map(abs, b.terms.values()))) + 29
+
+    for _ in range(HEURISTIC_GCD_ATTEMPTS):
+        h = _heuristic_gcd(_evaluate(a, i, x), _evaluate(b, i, x), i + 1)
+
+        if h is None:
+            return None
+
+        h = _interpolate(h, i, x).primitive()
+
+        try:
+            a.exquo(h)
+            b.exquo(h)
+
+        except PolynomialError:
+            x = 73794 * x * isqrt(isqrt(x)) // 27011
+
+        else:
+            return h * content
+
+    return None
+
+
+def expand(expr: Expr) -> Expr:
+    """
+    Expanded canonical form of a polynomial expression.
+    """
+
+    return Poly.from_expr(expr).to_expr()
+
+
+def collect(expr: Expr, x: Symbol) -> Expr:
+    """
+    Polynomial expression with the terms of the same power of x
+    collected together.
+    """
+
+    p = Poly.from_expr(expr)
+
+    if x not in p.gens:
+        return p.to_expr()
+
+    i = p.gens.index(x)
+    terms = []
+
+    for k, coefficient in sorted(p.coefficients_in(i).items()):
+
+        if k == 0:
+            c = coefficient.to_expr()
+            terms.extend(c.leaves if not c.is_atom and c.head is SymbolPlus else [c])
+
+        elif len(coefficient) == 1:
+            # a single term is written with the power among its factors
+            (m, d), = coefficient.terms.items()
+            terms.append(_term_expr(d, m[:i] + (k,) + m[i + 1:], p.gens))
+
+        else:
+            power = x if k == 1 else Expr(SymbolPower, x, Integer(k))
+            terms.append(Expr(SymbolTimes, coefficient.to_expr(), power))
+
+    if not terms:
+        return Integer0
+
+    return terms[0] if len(terms) == 1 else Expr(SymbolPlus, *terms)
+
+
+def polynomial_gcd(a: Expr, b: Expr) -> Expr:
+    """
+    Greatest common divisor of two polynomial expressions.
+    """
+
+    return Poly.from_expr(a).gcd(Poly.from_expr(b)).to_expr()
+
+
+__all__ = ['Poly', 'PolynomialError', 'expand', 'collect', 'polynomial_gcd']
@@ -0,0 +1,455 @@
+"""
+Power series as lazy streams of coefficients.
+
+A `Series` is c0 + c1 x + c2 x^2 + ... where each coefficient is
+computed by a rule on first request and memoized. Arithmetic,
+composition and inversion build new rules on top of their operands, so
+nothing is computed before a coefficient is asked for, and only up to
+the requested order. Coefficients stay exact (int and rationals of the
+number backend) unless floats are put in.
+
+Term streams can be summed numerically with Richardson or Levin u
+acceleration.
+"""
+
+import math
+import mpmath
+import sympy
+
+from typing import Callable, Iterable, List, Sequence, Union
+
+from . import numbers as nums
+from .expression import Expr, Symbol
+from .numbers import Integer, Rational, MachineReal, PrecisionReal, Complex, Number, roundx, to_python
+
+SymbolList = Symbol('List')
+SymbolSeriesData = Symbol('SeriesData')
+
+
+def _value(c):
+    """
+    Value of a MathX number to compute with: int or rational of the
+    number backend, float, complex, or sympy.Float for PrecisionReal,
+    which keeps its precision. Other values are returned as they are.
+    """
+
+    if isinstance(c, Complex):
+        return to_python(c)
+
+    if isinstance(c, Number):
+        return c._value
+
+    return c
+
+
+def _number(c) -> Number:
+    """
+    MathX number of a coefficient.
+    """
+
+    if isinstance(c, Number):
+        return c
+
+    if isinstance(c, float):
+        return MachineReal(c)
+
+    if isinstance(c, complex):
+        return Complex(MachineReal(c.real), MachineReal(c.imag))
+
+    if isinstance(c, sympy.Float):
+        return PrecisionReal(c)
+
+    if isinstance(c, mpmath.mpf):
+        return MachineReal(float(c))
+
+    if c.denominator == 1:
+        return Integer(int(c.numerator))
+
+    return Rational(int(c.numerator), int(c.denominator))
+
+
+def _inverse(c):
+
+    if isinstance(c, (float, complex, sympy.Float)):
+        return 1 / c
+
+    return nums.backend.rational(1) / c
+
+
+def _mpf(c) -> mpmath.mpf:
+    """
+    mpmath number at the working precision of a coefficient or term.
+    """
+
+    c = _value(c)
+
+    if isinstance(c, sympy.Float):
+        return mpmath.mpf(c._mpf_)
+
+    if isinstance(c, (int, float, complex, mpmath.mpf, mpmath.mpc)):
+        return mpmath.mpmathify(c)
+
+    return mpmath.mpf(int(c.numerator)) / int(c.denominator)
+
+
+def _real(value: mpmath.mpf, dps: Union[int, None]) -> Union[MachineReal, PrecisionReal]:
+
+    if isinstance(value, mpmath.mpc):
+        return Complex(_real(value.real, dps), _real(value.imag, dps))
+
+    if dps is None:
+        return MachineReal(float(value))
+
+    return PrecisionReal(sympy.Float(value, dps))
+
+
+class Series(object):
+    """
+    Power series in one variable with lazily computed coefficients.
+
+    `rule(n)` returns the n-th coefficient, it is called for increasing
+    n, so it may use the coefficients of lower order of the series
+    itself. `valuation` is a lower bound of the index of the first
+    non-zero coefficient, products use it to skip known zeros.
+    """
+
+    __slots__ = ['_rule', '_coefficients', '_valuation']
+
+    def __new__(cls, rule: Callable[[int], object], valuation: int = 0) -> 'Series':
+        obj = super(Series, cls).__new__(cls)
+        obj._rule = rule
+        obj._coefficients = []
+        obj._valuation = valuation
+        return obj
+
+    @classmethod
+    def from_coefficients(cls, coefficients: Sequence) -> 'Series':
+        """
+        Series of a polynomial, lowest power first.
+        """
+        coefficients = [_value(c) for c in coefficients]
+        valuation = next((i for i, c in enumerate(coefficients) if c), len(coefficients))
+        return cls(lambda n: coefficients[n] if n < len(coefficients) else 0, valuation)
+
+    @classmethod
+    def from_iterable(cls, coefficients: Iterable) -> 'Series':
+        """
+        Series of a stream of coefficients, it is read as needed.
+        """
+        iterator = iter(coefficients)
+        return cls(lambda n: next(iterator, 0))
+
+    @classmethod
+    def constant(cls, c) -> 'Series':
+        return cls.from_coefficients([c])
+
+    @classmethod
+    def variable(cls) -> 'Series':
+        return cls.from_coefficients([0, 1])
+
+    @property
+    def valuation(self) -> int:
+        return self._valuation
+
+    def coefficient(self, n: int):
+        """
+        n-th coefficient, computed with all the lower ones if needed.
+        """
+        coefficients = self._coefficients
+
+        while len(coefficients) <= n:
+            k = len(coefficients)
+            coefficients.append(_value(self._rule(k)) if k >= self._valuation else 0)
+
+        return coefficients[n]
+
+    def __getitem__(self, n: int):
+        return self.coefficient(n)
+
+    def coefficients(self, order: int, dps: int = None) -> List[Number]:
+        """
+        MathX numbers of the coefficients of x^0 to x^(order - 1), exact
+        unless dps decimal digits are asked for.
+        """
+        numbers = [_number(self.coefficient(n)) for n in range(order)]
+
+        if dps is None:
+            return numbers
+
+        return [roundx(c, dps) if not isinstance(c, MachineReal) else c for c in numbers]
+
+    def to_expr(self, x: Symbol, order: int, dps: int = None) -> Expr:
+        """
+        SeriesData expression of the series up to x^(order - 1).
+        """
+        coefficients = Expr(SymbolList, *self.coefficients(order, dps))
+        return Expr(SymbolSeriesData, x, Integer(0), coefficients, Integer(0), Integer(order), Integer(1))
+
+    def terms(self, x) -> Iterable:
+        """
+        Stream of the terms c_n x^n, x is a python or MathX number.
+        """
+        x = _value(x)
+        n = 0
+        power = 1
+
+        while True:
+            yield self.coefficient(n) * power
+            power = power * x
+            n += 1
+
+    def evaluate(self, x, order: int, dps: int = None) -> Number:
+        """
+        Partial sum of the terms up to x^(order - 1), exact when x and
+        the coefficients are, otherwise at dps digits or machine
+        precision.
+        """
+        terms = self.terms(x)
+        total = sum(next(terms) for _ in range(order))
+
+        if dps is None:
+            return _number(total)
+
+        with mpmath.workdps(dps):
+            return _real(_mpf(total), dps)
+
+    def __add__(self, other) -> 'Series':
+        other = _series(other)
+        return Series(lambda n: self.coefficient(n) + other.coefficient(n), min(self._valuation, other._valuation))
+
+    __radd__ = __add__
+
+    def __neg__(self) -> 'Series':
+        return Series(lambda n: -self.coefficient(n), self._valuation)
+
+    def __sub__(self, other) -> 'Series':
+        return self + (-_series(other))
+
+    def __rsub__(self, other) -> 'Series':
+        return _series(other) - self
+
+    def __mul__(self, other) -> 'Series':
+
+        if not isinstance(other, Series):
+            other = _value(other)
+            return Series(lambda n: self.coefficient(n) * other, self._valuation)
+
+        va, vb = self._valuation, other._valuation
+
+        def rule(n):
+            return sum(self.coefficient(k) * other.coefficient(n - k) for k in range(va, n - vb + 1))
+
+        return Series(rule, va + vb)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, k: int) -> 'Series':
+
+        if not isinstance(k, int) or k < 0:
+            raise ValueError(f'series power must be a non-negative integer, got {k}')
+
+        # by squaring, a coefficient goes through O(log k) products
+        result = Series.constant(1)
+        base = self
+
+        while k:
+
+            if k & 1:
+                result = result * base
+
+            k >>= 1
+
+            if k:
+                base = base * base
+
+        return result
+
+    def reciprocal(self) -> 'Series':
+        """
+        Multiplicative inverse 1 / series, its constant term must be
+        non-zero.
+        """
+        a0 = self.coefficient(0)
+
+        if not a0:
+            raise ZeroDivisionError('reciprocal of series with zero constant term')
+
+        inverse = _inverse(a0)
+
+        def rule(n):
+            if n == 0:
+                return inverse
+
+            return -inverse * sum(self.coefficient(k) * result.coefficient(n - k) for k in range(1, n + 1))
+
+        result = Series(rule)
+        return result
+
+    def __truediv__(self, other) -> 'Series':
+
+        if not isinstance(other, Series):
+            return self * _inverse(_value(other))
+
+        return self * other.reciprocal()
+
+    def __rtruediv__(self, other) -> 'Series':
+        return _series(other) * self.reciprocal()
+
+    def compose(self, inner: 'Series') -> 'Series':
+        """
+        Series of self(inner), inner must have no constant term.
+        """
+        if inner.coefficient(0):
+            raise ValueError('inner series of a composition must have zero constant term')
+
+        # through the memo of inner, its rule may be a stateful stream
+        inner = Series(inner.coefficient, max(inner._valuation, 1))
+        powers = _Powers(inner)
+
+        def rule(n):
+            return sum(self.coefficient(k) * powers[k].coefficient(n)
+                       for k in range(self._valuation, n // inner._valuation + 1))
+
+        return Series(rule, self._valuation * inner._valuation)
+
+    def __call__(self, inner: 'Series') -> 'Series':
+        return self.compose(inner)
+
+    def reversion(self) -> 'Series':
+        """
+        Compositional inverse g with self(g(x)) = x, self must have zero
+        constant term and non-zero linear term.
+        """
+        if self.coefficient(0):
+            raise ValueError('reversion of series with non-zero constant term')
+
+        a1 = self.coefficient(1)
+
+        if not a1:
+            raise ValueError('reversion of series with zero linear term')
+
+        inverse = _inverse(a1)
+
+        def rule(n):
+            if n == 1:
+                return inverse
+
+            # [x^n] self(g) = 0, g^k for k >= 2 only needs g_1 ... g_(n-1)
+            return -inverse * sum(self.coefficient(k) * powers[k].coefficient(n) for k in range(2, n + 1))
+
+        result = Series(rule, 1)
+        powers = _Powers(result)
+        return result
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self._coefficients)} coefficients computed>"
+
+
+class _Powers(object):
+    """
+    Lazily built powers of a series, powers[k] is series ** k.
+    """
+
+    __slots__ = ['_series', '_powers']
+
+    def __new__(cls, series: Series) -> '_Powers':
+        obj = super(_Powers, cls).__new__(cls)
+        obj._series = series
+        obj._powers = [Series.constant(1)]
+        return obj
+
+    def __getitem__(self, k: int) -> Series:
+
+        while len(self._powers) <= k:
+            self._powers.append(self._powers[-1] * self._series)
+
+        return self._powers[k]
+
+
+def _series(value) -> Series:
+
+    if isinstance(value, Series):
+        return value
+
+    return Series.constant(value)
+
+
+def partial_sums(terms: Iterable) -> Iterable:
+    """
+    Stream of the partial sums of a stream of terms.
+    """
+
+    total = 0
+
+    for term in terms:
+        total = total + _value(term)
+        yield total
+
+
+def richardson(terms: Iterable, order: int = 10, dps: int = None) -> Union[MachineReal, PrecisionReal]:
+    """
+    Sum of a series whose partial sums converge like S + c1/n + c2/n^2
+    + ..., from its first 2 * order terms with Richardson extrapolation.
+    """
+
+    with mpmath.workdps(dps or 15):
+        sums = []
+
+        for term in terms:
+            term = _value(term)
+            sums.append(term if not sums else sums[-1] + term)
+
+            if len(sums) == 2 * order:
+                break
+
+        n = order
+        total = mpmath.mpf(0)
+
+        for k in range(order + 1):
+            weight = mpmath.mpf((n + k) ** order) / (math.factorial(k) * math.factorial(order - k))
+            total += (-1) ** (k + order) * weight * _mpf(sums[n + k - 1])
+
+        return _real(total, dps)
+
+
+def levin(terms: Iterable, order: int = 10, dps: int = None, beta: int = 1) -> Union[MachineReal, PrecisionReal]:
+    """
+    Sum of a series from its first order + 1 non-zero terms with the
+    Levin u transform, which handles both alternating and
+    logarithmically converging series. Zero terms, e.g. of odd or even
+    functions, are skipped; a stream ending or running into more than
+    order zeros in a row is summed as a finite series.
+    """
+
+    with mpmath.workdps(2 * (dps or 15)):
+        numerator = denominator = mpmath.mpf(0)
+        total = mpmath.mpf(0)
+        j = zeros = 0
+
+        for term in terms:
+            term = _mpf(term)
+
+            if not term:
+                zeros += 1
+
+                if zeros > order:
+                    return _real(total, dps)
+
+                continue
+
+            total += term
+            zeros = 0
+            omega = (beta + j) * term
+            weight = (-1) ** j * math.comb(order, j) * mpmath.mpf(beta + j) ** (order - 1) / omega
+            numerator += weight * total
+            denominator += weight
+            j += 1
+
+            if j > order:
+                # common factor (beta + order) ** (order - 1) cancels out
+                return _real(numerator / denominator, dps)
+
+        return _real(total, dps)
+
+
+__all__ = ['Series', 'partial_sums', 'richardson', 'levin']
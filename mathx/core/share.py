@@ -0,0 +1,103 @@
+"""
+Sharing of identical subexpressions.
+
+Expressions are immutable, so all the copies of a subexpression can be
+replaced by a single instance. `share` does it for an existing
+expression, and `ShareTable` can be fed the nodes of an expression as it
+is built bottom-up, see `mathx.core.parser.bridge.convert_shared`.
+"""
+
+from typing import Tuple
+
+from .expression import Expr, Symbol
+from .leaves import PackedLeaves
+from .memory import byte_count, own_bytes
+from .numbers import Complex, MachineReal, PrecisionReal
+from .traversal import _transform
+
+
+def _atom_key(node: Expr) -> tuple:
+
+    if isinstance(node, MachineReal):
+        # hex tells 0.0 and -0.0 apart
+        return MachineReal, node._value.hex()
+
+    elif isinstance(node, PrecisionReal):
+        return PrecisionReal, node._value._mpf_, node._value._prec
+
+    elif isinstance(node, Complex):
+        return Complex, _atom_key(node._real), _atom_key(node._imag)
+
+    else:
+        return type(node), node._value
+
+
+class ShareTable(object):
+    """
+    Table of the canonical instance of every distinct subexpression.
+    """
+
+    __slots__ = ['_table', '_saved']
+
+    def __new__(cls) -> 'ShareTable':
+        obj = super(ShareTable, cls).__new__(cls)
+        obj._table = {}
+        obj._saved = 0
+        return obj
+
+    @property
+    def saved(self) -> int:
+        """
+        Bytes of the nodes given to `intern` that were replaced by an
+        existing instance.
+        """
+        return self._saved
+
+    def __len__(self):
+        return len(self._table)
+
+    def intern(self, node: Expr) -> Expr:
+        """
+        Canonical instance of node. The head and leaves of node must
+        already be canonical instances.
+        """
+
+        if isinstance(node, Symbol):
+            return node
+
+        if node.is_atom:
+            key = _atom_key(node)
+
+        elif isinstance(node.leaves, PackedLeaves):
+            # hashed and compared in place, the buffer may be a memory map
+            key = Expr, id(node.head), node.leaves
+
+        else:
+            key = (Expr, id(node.head)) + tuple(id(leaf) for leaf in node.leaves)
+
+        canonical = self._table.setdefault(key, node)
+
+        if canonical is not node:
+            self._saved += own_bytes(node)
+
+        return canonical
+
+
+def share(expr: Expr) -> Tuple[Expr, int]:
+    """
+    expr with all its identical subexpressions collapsed into a single
+    instance, and the number of bytes saved.
+    """
+
+    table = ShareTable()
+    result = _transform(expr,
+                        enter=lambda node, k: None,
+                        leave=lambda node, rebuilt, k: table.intern(rebuilt),
+                        descend=lambda node, k: not isinstance(node.leaves, PackedLeaves),
+                        key=lambda node, k: id(node),
+                        heads=True)
+
+    return result, byte_count(expr) - byte_count(result)
+
+
+__all__ = ['ShareTable', 'share']
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Read-only on-disk store of expressions.
+
+The file is a sequence of 8-byte aligned records, children are written
+before their parents and referenced by file offset, so an expression
+referenced several times is written once. Reading maps the file into
+memory and decodes a node only when it is accessed; processes opening
+the same file share its pages.
+
+Leaves made of machine numbers only are written as packed float64 or
+int64 runs and exposed as `PackedLeaves`, a zero-copy view of the map.
+"""
+
+import mmap
+import struct
+import sys
+import weakref
+
+import sympy
+
+from typing import Union
+
+from .expression import Expr, Symbol
+from .leaves import LeafStorage, PackedLeaves
+from .string import String
+from .numbers import Integer, Rational, MachineReal, PrecisionReal, Complex
+
+MAGIC = b'MATHXSTO'
+VERSION = 2
+
+# magic, version, byte order, root offset
+_header = struct.Struct('=8sII Q')
+
+# tag, count, leaf count, depth and byte count of the leaves
+_record = struct.Struct('=B7x QQQQ')
+
+_offset = struct.Struct('=Q')
+_float = struct.Struct('=d')
+
+TAG_EXPR = 1
+TAG_PACKED_REAL = 2
+TAG_PACKED_INTEGER = 3
+TAG_SYMBOL = 4
+TAG_STRING = 5
+TAG_INTEGER = 6
+TAG_RATIONAL = 7
+TAG_MACHINE_REAL = 8
+TAG_PRECISION_REAL = 9
+TAG_COMPLEX = 10
+
+_byte_orders = {'little': 1, 'big': 2}
+
+_int64_min = -2 ** 63
+_int64_max = 2 ** 63 - 1
+
+
+def _packed_typecode(expr: Expr) -> Union[str, None]:
+    """
+    'd' or 'q' when all the leaves of expr can be packed, None otherwise.
+    """
+
+    leaves = expr.leaves
+
+    if isinstance(leaves, PackedLeaves):
+        return leaves.typecode
+
+    if not leaves:
+        return None
+
+    if all(type(leaf) is MachineReal for leaf in leaves):
+        return 'd'
+
+    if all(type(leaf) is Integer and _int64_min <= leaf._value <= _int64_max for leaf in leaves):
+        return 'q'
+
+    return None
+
+
+class _Writer(object):
+    """
+    Writes the records of an expression to a binary file.
+    """
+
+    __slots__ = ['_file', '_offsets', '_position']
+
+    def __new__(cls, file) -> '_Writer':
+        obj = super(_Writer, cls).__new__(cls)
+        obj._file = file
+        obj._offsets = {}
+        obj._position = _header.size
+        return obj
+
+    def _write(self, tag: int, count: int, payload: bytes,
+               leaf_count: int = 0, depth: int = 0, byte_count: int = 0) -> int:
+        offset = self._position
+        record = _record.pack(tag, count, leaf_count, depth, byte_count)
+        padding = b'\0' * (-len(payload) % 8)
+        self._file.write(record + payload + padding)
+        self._position += len(record) + len(payload) + len(padding)
+        return offset
+
+    def _children(self, node) -> tuple:
+
+        if isinstance(node, Complex):
+            return node._real, node._imag
+
+        elif node.is_atom:
+            return ()
+
+        elif _packed_typecode(node) is not None:
+            return node.head,
+
+        else:
+            return (node.head,) + tuple(node.leaves)
+
+    def dump(self, expr: Expr) -> int:
+        """
+        Write expr and all its subexpressions not written yet, returns
+        the offset of its record.
+        """
+
+        # nodes are kept with their offset, leaves decoded on access
+        # (e.g. from another store) would otherwise be freed and their
+        # ids reused
+        offsets = self._offsets
+        stack = [(expr, None)]
+
+        while stack:
+            node, children = stack.pop()
+
+            if id(node) in offsets:
+                continue
+
+            if children is not None:
+                offsets[id(node)] = self._encode(node, children), node
+
+            else:
+                children = self._children(node)
+                stack.append((node, children))
+                stack.extend((child, None) for child in children if id(child) not in offsets)
+
+        return offsets[id(expr)][0]
+
+    def _offset(self, node) -> bytes:
+        return _offset.pack(self._offsets[id(node)][0])
+
+    def _encode(self, node, children: tuple) -> int:
+
+        if isinstance(node, Symbol):
+            payload = node.fullname.encode('utf-8')
+            return self._write(TAG_SYMBOL, len(payload), payload)
+
+        elif isinstance(node, String):
+            payload = node._value.encode('utf-8')
+            return self._write(TAG_STRING, len(payload), payload)
+
+        elif isinstance(node, Integer):
+            value = int(node._value)
+            payload = value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+            return self._write(TAG_INTEGER, len(payload), payload)
+
+        elif isinstance(node, Rational):
+            # length of the numerator, numerator, then the denominator
+            value = node._value
+            numerator, denominator = int(value.numerator), int(value.denominator)
+            p = numerator.to_bytes(numerator.bit_length() // 8 + 1, 'little', signed=True)
+            q = denominator.to_bytes((denominator.bit_length() + 7) // 8, 'little')
+            payload = _offset.pack(len(p)) + p + q
+            return self._write(TAG_RATIONAL, len(payload), payload)
+
+        elif isinstance(node, MachineReal):
+            return self._write(TAG_MACHINE_REAL, 0, _float.pack(node._value))
+
+        elif isinstance(node, PrecisionReal):
+            sign, man, exp, bc = node._value._mpf_
+            payload = f'{sign} {man:x} {exp} {bc} {node._value._prec}'.encode('ascii')
+            return self._write(TAG_PRECISION_REAL, len(payload), payload)
+
+        elif isinstance(node, Complex):
+            real, imag = children
+            return self._write(TAG_COMPLEX, 0, self._offset(real) + self._offset(imag))
+
+        elif node.is_atom:
+            raise TypeError(f'cannot store atom of type {type(node)}')
+
+        head = self._offset(children[0])
+        leaves = node.leaves
+        typecode = _packed_typecode(node)
+
+        if typecode is not None:
+            tag = TAG_PACKED_REAL if typecode == 'd' else TAG_PACKED_INTEGER
+
+            if isinstance(leaves, PackedLeaves):
+                data = leaves.data.tobytes()
+
+            else:
+                data = struct.pack(f'={len(leaves)}{typecode}', *(leaf._value for leaf in leaves))
+
+            return self._write(tag, len(leaves), head + data)
+
+        else:
+            data = b''.join(map(self._offset, children[1:]))
+            # aggregates of the leaves alone, the node is rebuilt around them
+            leaf_count = node.leaf_count - node.head.leaf_count
+            byte_count = node.byte_count - node.head.byte_count - sys.getsizeof(node) - sys.getsizeof(leaves)
+            return self._write(TAG_EXPR, len(leaves), head + data, leaf_count, node.depth - 1, byte_count)
+
+
+def dump(expr: Expr, path: str) -> None:
+    """
+    Write expr to a new store at path.
+    """
+
+    with open(path, 'wb') as file:
+        file.write(b'\0' * _header.size)
+        root = _Writer(file).dump(expr)
+        file.seek(0)
+        file.write(_header.pack(MAGIC, VERSION, _byte_orders[sys.byteorder], root))
+
+
+class _StoredLeaves(LeafStorage):
+    """
+    Leaves of a stored expression, decoded on access.
+    """
+
+    __slots__ = ['_store', '_offsets', '_leaf_count', '_depth', '_byte_count']
+
+    def __new__(cls, store: 'ExprStore', offsets: memoryview,
+                leaf_count: int, depth: int, byte_count: int) -> '_StoredLeaves':
+        obj = super(_StoredLeaves, cls).__new__(cls)
+        obj._store = store
+        obj._offsets = offsets
+        obj._leaf_count = leaf_count
+        obj._depth = depth
+        obj._byte_count = byte_count
+        return obj
+
+    @property
+    def leaf_count(self) -> int:
+        return self._leaf_count
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @property
+    def byte_count(self) -> int:
+        return self._byte_count
+
+    def _item(self, i: int):
+        return self._store.node(self._offsets[i])
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        return map(self._store.node, self._offsets)
+
+    def __eq__(self, other):
+
+        if isinstance(other, _StoredLeaves) and other._store is self._store:
+            # leaves evicted from the cache are decoded again as new objects
+            return self._offsets == other._offsets
+
+        return super(_StoredLeaves, self).__eq__(other)
+
+    # the hash of the leaves would change with their decoding
+    __hash__ = None
+
+    def __sizeof__(self):
+        # The offsets live in the memory map
+        return object.__sizeof__(self)
+
+
+class ExprStore(object):
+    """
+    Read-only expression store opened with mmap.
+
+    >>> with ExprStore(path) as store:
+    ...     expr = store.root
+    """
+
+    __slots__ = ['_file', '_map', '_buffer', '_root', '_nodes']
+
+    def __new__(cls, path: str) -> 'ExprStore':
+        obj = super(ExprStore, cls).__new__(cls)
+        obj._file = open(path, 'rb')
+        obj._map = mmap.mmap(obj._file.fileno(), 0, access=mmap.ACCESS_READ)
+        obj._buffer = memoryview(obj._map)
+        obj._nodes = weakref.WeakValueDictionary()
+
+        magic, version, byte_order, obj._root = _header.unpack_from(obj._buffer, 0)
+
+        if magic != MAGIC or version != VERSION:
+            obj.close()
+            raise ValueError(f'{path} is not a MathX expression store of version {VERSION}')
+
+        if byte_order != _byte_orders[sys.byteorder]:
+            obj.close()
+            raise ValueError(f'{path} was written on a machine of different byte order')
+
+        return obj
+
+    @property
+    def root(self) -> Expr:
+        return self.node(self._root)
+
+    def node(self, offset: int) -> Expr:
+        """
+        Expression of the record at offset, a node is decoded once for
+        as long as it is referenced.
+        """
+
+        node = self._nodes.get(offset)
+
+        if node is None:
+            node = self._decode(offset)
+            self._nodes[offset] = node
+
+        return node
+
+    def _decode(self, offset: int) -> Expr:
+        tag, count, leaf_count, depth, byte_count = _record.unpack_from(self._buffer, offset)
+        start = offset + _record.size
+        payload = self._buffer[start:start + count]
+
+        if tag == TAG_SYMBOL:
+            return Symbol(str(payload, 'utf-8'))
+
+        elif tag == TAG_STRING:
+            return String(str(payload, 'utf-8'))
+
+        elif tag == TAG_INTEGER:
+            return Integer(int.from_bytes(payload, 'little', signed=True))
+
+        elif tag == TAG_RATIONAL:
+            size, = _offset.unpack_from(payload, 0)
+            p = int.from_bytes(payload[8:8 + size], 'little', signed=True)
+            q = int.from_bytes(payload[8 + size:], 'little')
+            return Rational(p, q)
+
+        elif tag == TAG_MACHINE_REAL:
+            return MachineReal(_float.unpack_from(self._buffer, start)[0])
+
+        elif tag == TAG_PRECISION_REAL:
+            sign, man, exp, bc, prec = str(payload, 'ascii').split()
+            mpf = (int(sign), int(man, 16), int(exp), int(bc))
+
+            # sympy.Float._new turns a zero mantissa into S.Zero, dropping the precision
+            if not mpf[1]:
+                return PrecisionReal(sympy.Float(0, precision=int(prec)))
+
+            return PrecisionReal(sympy.Float._new(mpf, int(prec)))
+
+        elif tag == TAG_COMPLEX:
+            real, imag = struct.unpack_from('=QQ', self._buffer, start)
+            return Complex(self.node(real), self.node(imag))
+
+        head = self.node(_offset.unpack_from(self._buffer, start)[0])
+        data = self._buffer[start + 8:start + 8 + count * 8]
+
+        if tag == TAG_PACKED_REAL:
+            return Expr.from_leaves(head, PackedLeaves(data.cast('d'), MachineReal))
+
+        elif tag == TAG_PACKED_INTEGER:
+            return Expr.from_leaves(head, PackedLeaves(data.cast('q'), Integer))
+
+        elif tag == TAG_EXPR:
+            return Expr.from_leaves(head, _StoredLeaves(self, data.cast('Q'), leaf_count, depth, byte_count))
+
+        else:
+            raise ValueError(f'corrupted store, unknown record tag {tag} at {offset}')
+
+    def close(self):
+        """
+        Close the store. Expressions decoded from it stay usable: their
+        packed and stored leaves view the map, which is then unmapped
+        when the last of them is freed.
+        """
+        self._nodes.clear()
+        self._file.close()
+        self._buffer.release()
+
+        try:
+            self._map.close()
+
+        except BufferError:
+            # stored leaves still decode from the map
+            self._buffer = memoryview(self._map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self._file.name}>"
+
+
+__all__ = ['ExprStore', 'dump']
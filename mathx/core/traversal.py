@@ -0,0 +1,306 @@
+"""
+Traversal and substitution over expressions.
+
+Level specifications follow Mathematica: `n` is levels 1 through n,
+`(n,)` is level n only, `(m, n)` is levels m through n and None is every
+level from 0. Negative levels count from the bottom, an atom is at
+level -1 and an expression of depth d at level -d. Heads are not part
+of any level.
+
+Everything is iterative, so arbitrarily deep expressions are fine, and
+rebuilding returns the original node when nothing below it changed.
+"""
+
+from math import inf
+from typing import Callable, Iterator, Sequence, Tuple, Union
+
+from .expression import Expr
+from .compare import sameQ
+from .leaves import PackedLeaves
+from .numbers import Number
+
+LevelSpec = Union[None, int, Tuple[int], Tuple[int, int]]
+Pattern = Union[Expr, Callable[[Expr], bool]]
+
+
+def levels(spec: LevelSpec) -> Tuple[int, int]:
+    """
+    Normalize level specification to (lo, hi).
+    """
+
+    if spec is None:
+        return 0, inf
+
+    elif isinstance(spec, (int, float)):
+        return 1, spec
+
+    elif len(spec) == 1:
+        return spec[0], spec[0]
+
+    else:
+        lo, hi = spec
+        return lo, hi
+
+
+def _in_levels(k: int, depth: int, lo, hi) -> bool:
+    """
+    Is node of depth at level k inside levels lo through hi.
+    """
+
+    return ((k >= lo) if lo >= 0 else (-depth >= lo)) and ((k <= hi) if hi >= 0 else (-depth <= hi))
+
+
+def _matcher(pattern: Pattern) -> Callable[[Expr], bool]:
+
+    if callable(pattern):
+        return pattern
+
+    return lambda expr: sameQ(expr, pattern)
+
+
+def _walk(expr: Expr, spec: LevelSpec) -> Iterator[Tuple[Expr, tuple]]:
+    """
+    Yield (node, path) of the parts of expr in spec, depth first, leaves
+    before their parent. The path is a linked (index, parent path) pair,
+    see `_position`, so deep expressions are not quadratic.
+    """
+
+    lo, hi = levels(spec)
+    stack = [(expr, 0, None, False)]
+
+    while stack:
+        node, k, path, expanded = stack.pop()
+
+        if not expanded and not node.is_atom and (hi < 0 or k < hi):
+            stack.append((node, k, path, True))
+            leaves = list(enumerate(node.leaves, 1))
+            stack.extend((leaf, k + 1, (i, path), False) for i, leaf in reversed(leaves))
+
+        elif _in_levels(k, node.depth, lo, hi):
+            yield node, path
+
+
+def _position(path) -> tuple:
+    indices = []
+
+    while path is not None:
+        i, path = path
+        indices.append(i)
+
+    return tuple(reversed(indices))
+
+
+def iter_level(expr: Expr, spec: LevelSpec = 1) -> Iterator[Expr]:
+    """
+    Lazily yield the parts of expr in spec.
+    """
+
+    return (node for node, _ in _walk(expr, spec))
+
+
+def level(expr: Expr, spec: LevelSpec = 1) -> list:
+    """
+    List of the parts of expr in spec.
+    """
+
+    return list(iter_level(expr, spec))
+
+
+def iter_position(expr: Expr, pattern: Pattern, spec: LevelSpec = None) -> Iterator[tuple]:
+    """
+    Lazily yield the positions of the parts of expr matching pattern.
+    """
+
+    match = _memoized(_matcher(pattern))
+    return (_position(path) for node, path in _walk(expr, spec) if match(node))
+
+
+def position(expr: Expr, pattern: Pattern, spec: LevelSpec = None) -> list:
+    """
+    List of the positions of the parts of expr matching pattern, a
+    position is the tuple of 1-based indices of the part.
+    """
+
+    return list(iter_position(expr, pattern, spec))
+
+
+def iter_cases(expr: Expr, pattern: Pattern, spec: LevelSpec = 1) -> Iterator[Expr]:
+    """
+    Lazily yield the parts of expr in spec matching pattern.
+    """
+
+    match = _memoized(_matcher(pattern))
+    return (node for node in iter_level(expr, spec) if match(node))
+
+
+def cases(expr: Expr, pattern: Pattern, spec: LevelSpec = 1) -> list:
+    """
+    List of the parts of expr in spec matching pattern.
+    """
+
+    return list(iter_cases(expr, pattern, spec))
+
+
+def _memoized(match: Callable[[Expr], bool]) -> Callable[[Expr], bool]:
+    # a subtree shared in several places is matched once
+    results = {}
+
+    def memoized(expr):
+        result = results.get(id(expr))
+
+        if result is None:
+            result = results[id(expr)] = (match(expr), expr)
+
+        return result[0]
+
+    return memoized
+
+
+def _transform(expr: Expr, enter, leave, descend, key, heads=False, packed=True) -> Expr:
+    """
+    Rebuild expr bottom-up.
+
+    `enter(node, k)` may return the replacement of a node, which is
+    then not descended. Otherwise its children are transformed when
+    `descend(node, k)` and the rebuilt node is passed to
+    `leave(node, rebuilt, k)`. Results are memoized under `key(node, k)`,
+    so a subtree shared in several places is processed once. Packed
+    leaves are kept as they are, without being visited, unless `packed`.
+    """
+
+    # node is kept along its result, so that its id is not reused by a
+    # leaf built on access
+    memo = {}
+    stack = [(expr, 0, None)]
+
+    while stack:
+        node, k, children = stack.pop()
+        mk = key(node, k)
+
+        if mk in memo:
+            continue
+
+        if children is not None:
+            # the leaves are listed once, a storage may build them on access
+            head = memo[key(children[0], k + 1)][0] if heads else node.head
+            old = children[heads:]
+            leaves = [memo[key(leaf, k + 1)][0] for leaf in old]
+            memo[mk] = leave(node, _rebuild(node, head, leaves, old), k), node
+            continue
+
+        new = enter(node, k)
+
+        if new is not None:
+            memo[mk] = new, node
+
+        elif node.is_atom or not descend(node, k):
+            memo[mk] = leave(node, node, k), node
+
+        else:
+            if packed or not isinstance(node.leaves, PackedLeaves):
+                children = list(node.leaves)
+
+            else:
+                children = []
+
+            if heads:
+                children.insert(0, node.head)
+
+            stack.append((node, k, children))
+            stack.extend((child, k + 1, None) for child in reversed(children) if key(child, k + 1) not in memo)
+
+    return memo[key(expr, 0)][0]
+
+
+def _rebuild(node: Expr, head: Expr, leaves: Sequence[Expr], old: Sequence[Expr]) -> Expr:
+    """
+    node with the new head and leaves, node itself if they are the same.
+    `old` are the leaves of node the new ones were computed from, a
+    storage may build new objects on every access to node.leaves.
+    """
+
+    if all(new is leaf for new, leaf in zip(leaves, old)):
+
+        if head is node.head:
+            return node
+
+        return Expr.from_leaves(head, node.leaves)
+
+    return Expr(head, *leaves)
+
+
+def _function(f) -> Callable[[Expr], Expr]:
+    # an expression used as function is applied as head
+    if callable(f):
+        return f
+
+    return lambda expr: Expr(f, expr)
+
+
+def map_expr(f, expr: Expr, spec: LevelSpec = 1) -> Expr:
+    """
+    Apply f to the parts of expr in spec, inner parts first. f is a
+    python function or an expression used as head.
+    """
+
+    f = _function(f)
+    lo, hi = levels(spec)
+
+    def leave(node, rebuilt, k):
+        return f(rebuilt) if _in_levels(k, node.depth, lo, hi) else rebuilt
+
+    return _transform(expr,
+                      enter=lambda node, k: None,
+                      leave=leave,
+                      descend=lambda node, k: hi < 0 or k < hi,
+                      key=lambda node, k: (id(node), k))
+
+
+def map_all(f, expr: Expr) -> Expr:
+    """
+    Apply f to every part of expr, inner parts first.
+    """
+
+    f = _function(f)
+    return _transform(expr,
+                      enter=lambda node, k: None,
+                      leave=lambda node, rebuilt, k: f(rebuilt),
+                      descend=lambda node, k: True,
+                      key=lambda node, k: id(node))
+
+
+def replace_all(expr: Expr, rules: Sequence[Tuple[Pattern, Union[Expr, Callable[[Expr], Expr]]]]) -> Expr:
+    """
+    Replace every part of expr, heads included, matching the left hand
+    side of a rule with its right hand side. The first matching rule is
+    used and the result is not searched again.
+
+    The right hand side is an expression, or a python function called
+    with the matched part.
+    """
+
+    # packed leaves are machine numbers, only functions and numbers may
+    # match them
+    packed = any(callable(lhs) or isinstance(lhs, Number) for lhs, _ in rules)
+    rules = [(_matcher(lhs), rhs if callable(rhs) else (lambda node, rhs=rhs: rhs)) for lhs, rhs in rules]
+
+    def enter(node, k):
+
+        for match, rhs in rules:
+
+            if match(node):
+                return rhs(node)
+
+        return None
+
+    return _transform(expr,
+                      enter=enter,
+                      leave=lambda node, rebuilt, k: rebuilt,
+                      descend=lambda node, k: True,
+                      key=lambda node, k: id(node),
+                      heads=True,
+                      packed=packed)
+
+
+__all__ = ['levels', 'level', 'iter_level', 'position', 'iter_position', 'cases', 'iter_cases',
+           'map_expr', 'map_all', 'replace_all']
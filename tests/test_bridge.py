@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+pytest.importorskip('mathics_parser')
+
+from mathics_parser.ast import Node, Number, Symbol  # noqa: E402
+
+from mathx.core.compare import sameQ  # noqa: E402
+from mathx.core.leaves import PackedLeaves  # noqa: E402
+from mathx.core.memory import byte_count  # noqa: E402
+from mathx.core.numbers import MachineReal, PrecisionReal  # noqa: E402
+from mathx.core.parser.bridge import PACKED_THRESHOLD, convert, convert_shared, make_PrecisionReal  # noqa: E402
+
+
+class Definitions(object):
+    def lookup_symbol_name(self, name):
+        return 'System`' + name
+
+
+definitions = Definitions()
+
+
+def test_precision_zero():
+    zero = make_PrecisionReal(('DecimalString', '0.00000000000000000000000'), 23)
+    one = make_PrecisionReal(('DecimalString', '1.0000000000000000000000'), 23)
+
+    assert isinstance(zero, PrecisionReal)
+    assert not zero._value
+    assert zero._value._prec == one._value._prec
+
+    zero = make_PrecisionReal(('Rational', 0, 1), 30)
+    assert zero._value._prec == make_PrecisionReal(('Rational', 1, 3), 30)._value._prec
+
+
+def test_packed_run_matches_literals():
+    rng = random.Random(0)
+
+    for _ in range(50):
+        if rng.random() < 0.5:
+            numbers = [Number(str(rng.randint(0, 10 ** 6)), sign=rng.choice([1, -1]), exp=rng.randint(0, 6))
+                       for _ in range(PACKED_THRESHOLD)]
+        else:
+            numbers = [Number(f'{rng.randint(0, 999)}.{rng.randint(0, 999)}', exp=rng.randint(-300, 300))
+                       for _ in range(PACKED_THRESHOLD)]
+
+        packed = convert(Node(Symbol('List'), *numbers), definitions)
+        literals = [convert(number, definitions) for number in numbers]
+
+        assert isinstance(packed.leaves, PackedLeaves)
+        assert all(sameQ(leaf, literal) for leaf, literal in zip(packed.leaves, literals))
+
+
+def test_packed_run_overflow():
+    numbers = [Number('1.5', exp=1)] * (PACKED_THRESHOLD - 1) + [Number('1.5', exp=400)]
+
+    with pytest.raises(OverflowError):
+        convert(numbers[-1], definitions)
+
+    with pytest.raises(OverflowError):
+        convert(Node(Symbol('List'), *numbers), definitions)
+
+    numbers[-1] = Number('1.5', exp=300)
+    expr = convert(Node(Symbol('List'), *numbers), definitions)
+    assert isinstance(expr.leaves, PackedLeaves)
+    assert isinstance(expr.leaves[-1], MachineReal)
+
+
+def test_convert_share():
+    f = Node(Symbol('f'), *(Number(str(i)) for i in range(3)))
+    ast = Node(Symbol('List'), *([f] * 10), Node(Symbol('g'), f))
+
+    expr = convert(ast, definitions)
+    shared, saved = convert_shared(ast, definitions)
+
+    assert sameQ(shared, expr)
+    assert all(leaf is shared.leaves[0] for leaf in shared.leaves[:10])
+    assert shared.leaves[10].leaves[0] is shared.leaves[0]
+    assert saved == byte_count(expr) - byte_count(shared) > 0
@@ -0,0 +1,99 @@
+import random
+import sys
+
+from array import array
+
+from mathx.core.expression import Expr, Symbol
+from mathx.core.leaves import CHUNK, LeafVector, PackedLeaves
+from mathx.core.numbers import Integer, MachineReal
+
+SymbolList = Symbol('List')
+SymbolF = Symbol('Global`f')
+
+
+def random_leaf(rng):
+    if rng.random() < 0.7:
+        return Integer(rng.randint(-10 ** 6, 10 ** 6))
+
+    return Expr(SymbolF, *(Integer(i) for i in range(rng.randint(0, 3))))
+
+
+def assert_same(vector, reference):
+    assert len(vector) == len(reference)
+    assert list(vector) == reference
+    assert all(vector[i] is leaf for i, leaf in enumerate(reference))
+    assert all(vector[-i - 1] is leaf for i, leaf in enumerate(reversed(reference)))
+
+    # aggregates match the ones computed over a tuple
+    expr = Expr.from_leaves(SymbolList, vector)
+    flat = Expr(SymbolList, *reference)
+    assert expr.leaf_count == flat.leaf_count
+    assert expr.depth == flat.depth
+    assert expr.byte_count - sys.getsizeof(vector) == flat.byte_count - sys.getsizeof(flat.leaves)
+
+
+def test_random_operations():
+    rng = random.Random(0)
+
+    for size in (0, 1, CHUNK, CHUNK + 1, CHUNK ** 2 + 5):
+        reference = [random_leaf(rng) for _ in range(size)]
+        vector = LeafVector(reference)
+        versions = [(vector, list(reference))]
+
+        for _ in range(200):
+            op = rng.choice(['set', 'append', 'take', 'drop'])
+            n = len(reference)
+
+            if op == 'set' and n:
+                i = rng.randrange(-n, n)
+                leaf = random_leaf(rng)
+                vector = vector.set(i, leaf)
+                reference[i] = leaf
+
+            elif op == 'append':
+                leaf = random_leaf(rng)
+                vector = vector.append(leaf)
+                reference.append(leaf)
+
+            elif op == 'take' and rng.random() < 0.2:
+                k = rng.randint(-1, n + 1)
+                vector = vector.take(k)
+                reference = reference[:max(k, 0)]
+
+            elif op == 'drop' and rng.random() < 0.2:
+                k = rng.randint(-1, n + 1)
+                vector = vector.drop(k)
+                reference = reference[max(k, 0):]
+
+            assert_same(vector, reference)
+            versions.append((vector, list(reference)))
+
+        # persistent: earlier versions are left untouched
+        for old, expected in versions:
+            assert_same(old, expected)
+
+
+def test_large_appends():
+    vector = LeafVector()
+    reference = []
+
+    for i in range(3 * CHUNK ** 2):
+        leaf = Integer(i)
+        vector = vector.append(leaf)
+        reference.append(leaf)
+
+    assert_same(vector, reference)
+    assert_same(vector.drop(CHUNK ** 2 + 3).take(CHUNK + 7), reference[CHUNK ** 2 + 3:][:CHUNK + 7])
+    assert vector == tuple(reference)
+
+
+def test_packed_equality():
+    p = PackedLeaves(array('d', [0.5, 1.5, -0.0]), MachineReal)
+    q = PackedLeaves(memoryview(array('d', [0.5, 1.5, -0.0])), MachineReal)
+
+    assert p == p and p == q and not p != q
+    assert hash(p) == hash(q)
+    assert p != PackedLeaves(array('d', [0.5, 1.5, 0.0]), MachineReal)
+    assert p != PackedLeaves(array('q', [1, 2, 3]), Integer)
+    assert p != tuple(p)
+    assert len({p, q}) == 1
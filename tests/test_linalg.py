@@ -0,0 +1,156 @@
+import random
+
+import mpmath
+import pytest
+import sympy
+
+from mathx.core.expression import Expr, Symbol
+from mathx.core.linalg import Matrix, SingularMatrixError, det, dot, inverse, linear_solve
+from mathx.core.numbers import Integer, PrecisionReal, Rational, to_sympy
+
+SymbolList = Symbol('List')
+
+
+def vector(numbers):
+    return Expr(SymbolList, *numbers)
+
+
+def matrix(rows):
+    return Expr(SymbolList, *(vector(row) for row in rows))
+
+
+def precision_real(value, dps):
+    return PrecisionReal(sympy.Float(value, dps))
+
+
+def mpf_value(number, prec):
+
+    with mpmath.workprec(prec):
+
+        if isinstance(number, Rational):
+            return mpmath.mpf(int(number._value.numerator)) / int(number._value.denominator)
+
+        return mpmath.mpf(number._value._mpf_)
+
+
+def assert_precision(numbers, expected, prec):
+    for number, value in zip(numbers, expected):
+        assert isinstance(number, PrecisionReal)
+        assert number._value._prec == prec
+
+        with mpmath.workprec(prec):
+            assert mpmath.mpf(number._value._mpf_) == mpmath.mpf(value)
+
+
+def test_precision_linear_solve():
+    m = matrix([[precision_real(2, 30), Integer(1)], [Integer(1), Integer(3)]])
+    x = linear_solve(m, vector([Integer(1), Integer(2)]))
+    prec = m.leaves[0].leaves[0]._value._prec
+
+    with mpmath.workprec(prec):
+        expected = [mpmath.mpf(1) / 5, mpmath.mpf(3) / 5]
+
+    assert_precision(x.leaves, expected, prec)
+
+
+def test_precision_dot():
+    a = vector([precision_real(1, 40), Rational(1, 3)])
+    prec = a.leaves[0]._value._prec
+    product = dot(a, vector([Integer(1), Integer(1)]))
+
+    with mpmath.workprec(prec):
+        expected = 1 + mpmath.mpf(1) / 3
+
+    assert_precision([product], [expected], prec)
+
+
+def test_precision_round_trip():
+    rows = [[precision_real('0.1', 30), precision_real(0, 30)], [Rational(2, 7), precision_real('1e-20', 30)]]
+    prec = rows[0][0]._value._prec
+    result = Matrix.from_expr(matrix(rows)).to_expr()
+
+    for row, expected in zip(result.leaves, rows):
+        assert_precision(row.leaves, [mpf_value(x, prec) for x in expected], prec)
+
+    m = inverse(matrix([[precision_real(7, 30), Integer(0)], [Integer(0), Integer(-2)]]))
+
+    with mpmath.workprec(prec):
+        expected = [[mpmath.mpf(1) / 7, 0], [0, mpmath.mpf(-1) / 2]]
+
+    for row, values in zip(m.leaves, expected):
+        assert_precision(row.leaves, values, prec)
+
+    assert_precision([det(matrix([[precision_real(3, 30)]]))], [3], prec)
+
+
+def random_exact(rng, n, singular=False):
+    """
+    Random Integer/Rational matrix as mathx and sympy matrices, with
+    zeros on the diagonal to force row swaps.
+    """
+
+    def entry():
+        if rng.random() < 0.3:
+            return sympy.Integer(0)
+
+        if rng.random() < 0.5:
+            return sympy.Rational(rng.randint(-20, 20), rng.randint(1, 9))
+
+        return sympy.Integer(rng.randint(-10 ** 12, 10 ** 12))
+
+    rows = [[entry() for _ in range(n)] for _ in range(n)]
+
+    if singular and n > 1:
+        # last row a combination of two others
+        i, j = rng.sample(range(n - 1), 2) if n > 2 else (0, 0)
+        c = sympy.Rational(rng.randint(-5, 5), rng.randint(1, 5))
+        rows[-1] = [x + c * y for x, y in zip(rows[i], rows[j])]
+
+    elif singular:
+        rows = [[sympy.Integer(0)]]
+
+    return matrix([[exact(x) for x in row] for row in rows]), sympy.Matrix(rows)
+
+
+def exact(x):
+    return Integer(int(x)) if x.is_Integer else Rational(int(x.p), int(x.q))
+
+
+def sympy_matrix(expr):
+    return sympy.Matrix([[to_sympy(x) for x in row.leaves] for row in expr.leaves])
+
+
+def test_bareiss_random():
+    rng = random.Random(0)
+
+    for _ in range(60):
+        n = rng.randint(1, 7)
+        m, reference = random_exact(rng, n)
+        expected = reference.det()
+
+        assert to_sympy(det(m)) == expected
+
+        if expected == 0:
+            continue
+
+        assert sympy_matrix(inverse(m)) == reference.inv()
+
+        b, b_reference = random_exact(rng, n)
+        assert sympy_matrix(linear_solve(m, b)) == reference.LUsolve(b_reference)
+
+        x = linear_solve(m, b.leaves[0])
+        assert [to_sympy(v) for v in x.leaves] == list(reference.LUsolve(b_reference[0, :].T))
+
+
+def test_bareiss_singular():
+    rng = random.Random(1)
+
+    for _ in range(30):
+        m, _ = random_exact(rng, rng.randint(1, 6), singular=True)
+        assert to_sympy(det(m)) == 0
+
+        with pytest.raises(SingularMatrixError):
+            inverse(m)
+
+        with pytest.raises(SingularMatrixError):
+            linear_solve(m, vector([Integer(1)] * len(m.leaves)))
@@ -0,0 +1,161 @@
+
+import random
+
+from array import array
+
+import pytest
+
+from mathx.core.expression import Expr, Symbol
+from mathx.core.leaves import PackedLeaves
+from mathx.core.memory import MemoryLimitError, MemoryTracker, byte_count, own_bytes
+from mathx.core.numbers import Integer, MachineReal, Rational
+from mathx.core.share import ShareTable, share
+from mathx.core.store import ExprStore, dump
+
+SymbolList = Symbol('List')
+SymbolF = Symbol('Global`f')
+
+
+def strong_byte_count(expr):
+    # reference walk holding every node
+    nodes = {}
+    stack = [expr]
+
+    while stack:
+        node = stack.pop()
+
+        if id(node) not in nodes:
+            nodes[id(node)] = node
+
+            if not node.is_atom:
+                stack.append(node.head)
+                stack.extend(node.leaves)
+
+    return sum(map(own_bytes, nodes.values()))
+
+
+def test_byte_count_tree():
+    expr = Expr(SymbolList, *(Expr(SymbolF, Integer(i), Rational(1, i + 2)) for i in range(50)))
+    assert byte_count(expr) == expr.byte_count == strong_byte_count(expr)
+
+
+def test_byte_count_shared():
+    shared = Expr(SymbolF, *map(Integer, range(10)))
+    expr = Expr(SymbolList, *([shared] * 100))
+    assert byte_count(expr) == own_bytes(expr) + byte_count(shared)
+    assert byte_count(expr) < expr.byte_count
+
+
+def test_byte_count_stored(tmp_path):
+    expr = Expr(SymbolList, *(Expr(SymbolF, Integer(i), Rational(1, i + 2)) for i in range(200)))
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        assert byte_count(store.root) == strong_byte_count(store.root)
+
+
+def test_byte_count_packed():
+    packed = Expr.from_leaves(SymbolList, PackedLeaves(array('d', range(1000)), MachineReal))
+    expr = Expr(SymbolF, packed, packed)
+
+    # the elements are counted in the storage, not as nodes
+    assert byte_count(packed) == packed.byte_count == own_bytes(packed) + own_bytes(SymbolList)
+    assert byte_count(expr) == own_bytes(expr) + own_bytes(SymbolF) + byte_count(packed)
+
+
+def test_tracker_shared():
+    shared = Expr(SymbolF, *map(Integer, range(10)))
+    expr = Expr(SymbolList, *([shared] * 100))
+    tracker = MemoryTracker(expr.byte_count)
+
+    # the cached figure counts every reference
+    tracker.allocate(expr)
+    assert tracker.used == expr.byte_count
+    assert tracker.allocate(expr) is expr
+    assert tracker.used == expr.byte_count
+
+    with pytest.raises(MemoryLimitError):
+        tracker.allocate(shared)
+
+    assert tracker.release(expr) == expr.byte_count
+    assert tracker.used == 0
+    assert tracker.release(expr) == 0
+
+    # distinct nodes only when asked
+    tracker.allocate(expr, shared=True)
+    assert tracker.used == byte_count(expr) < expr.byte_count
+    assert tracker.release(expr) == byte_count(expr)
+
+    copies = Expr(SymbolList, *(Expr(SymbolF, *map(Integer, range(10))) for _ in range(100)))
+    result, saved = share(copies)
+    assert saved > 0
+    assert MemoryTracker(byte_count(result)).allocate(result, shared=True) is result
+
+
+def test_share_packed(tmp_path):
+    # the zeros of both typecodes have the same bytes
+    doubles = [Expr.from_leaves(SymbolList, PackedLeaves(array('d', [0.0] * 50), MachineReal)) for _ in range(2)]
+    ints = Expr.from_leaves(SymbolList, PackedLeaves(array('q', [0] * 50), Integer))
+    dump(Expr(SymbolF, *doubles, ints), tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        table = ShareTable()
+        stored = [table.intern(node) for node in store.root.leaves]
+
+        assert stored[1] is stored[0] and stored[2] is not stored[0]
+        assert table.intern(doubles[0]) is stored[0]
+        assert table.intern(ints) is stored[2]
+        assert len(table) == 2
+
+
+def test_tracker_random():
+    rng = random.Random(0)
+    pool = [Integer(i) for i in range(5)]
+
+    for _ in range(200):
+        pool.append(Expr(rng.choice([SymbolList, SymbolF]), *rng.sample(pool, rng.randint(0, 4))))
+
+    tracker = MemoryTracker(10 ** 9)
+    tracked = {}
+
+    for _ in range(500):
+        if tracked and rng.random() < 0.4:
+            expr = rng.choice(list(tracked))
+            assert tracker.release(expr) == tracked.pop(expr)
+
+        else:
+            expr = rng.choice(pool)
+            shared = rng.random() < 0.5
+
+            if expr not in tracker:
+                tracker.allocate(expr, shared)
+                tracked[expr] = byte_count(expr) if shared else expr.byte_count
+
+        assert tracker.used == sum(tracked.values())
+        assert len(tracker) == len(tracked)
+        assert set(map(id, tracker)) == set(map(id, tracked))
+
+
+def test_tracker_spill():
+    exprs = [Expr(SymbolF, *map(Integer, range(i, i + 10))) for i in range(10)]
+    size = byte_count(exprs[0])
+    spilled = []
+
+    def spill(tracker, requested):
+        for expr in tracker:
+            if tracker.available >= requested:
+                break
+
+            tracker.release(expr)
+            spilled.append(expr)
+
+    tracker = MemoryTracker(3 * size, spill)
+
+    for expr in exprs:
+        tracker.allocate(expr)
+
+    assert spilled == exprs[:7]
+    assert list(tracker) == exprs[7:]
+
+    with pytest.raises(MemoryLimitError):
+        MemoryTracker(size - 1).allocate(exprs[0])
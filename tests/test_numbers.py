@@ -0,0 +1,105 @@
+import random
+
+from fractions import Fraction
+
+import pytest
+import sympy
+
+from mathx.core import numbers
+from mathx.core.numbers import Integer, MachineReal, PrecisionReal, Rational, roundx, to_python, to_sympy
+
+
+@pytest.fixture(params=sorted(numbers.backends))
+def backend(request):
+    previous = numbers.set_backend(request.param)
+    yield numbers.backends[request.param]
+    numbers.set_backend(previous.name)
+
+
+def test_set_backend(backend):
+    assert numbers.backend is backend
+    assert set(numbers.backends) >= {'python'}
+
+    with pytest.raises(ValueError):
+        numbers.set_backend('missing')
+
+    assert numbers.backend is backend
+
+
+def test_value_types(backend):
+    assert type(Integer(3)._value) is backend._integer
+    assert type(Integer(sympy.Integer(3))._value) is backend._integer
+    assert type(Rational(1, 3)._value) is backend._rational
+
+
+@pytest.mark.parametrize('args, expected', [
+    ((1, 3), Fraction(1, 3)),
+    ((6, -4), Fraction(-3, 2)),
+    ((5,), Fraction(5)),
+    ((0.5,), Fraction(1, 2)),
+    ((0.1,), Fraction(0.1)),
+    (('1/3',), Fraction(1, 3)),
+    (('0.1',), Fraction(1, 10)),
+    ((0.5, 2), Fraction(1, 4)),
+    ((sympy.Rational(2, 3),), Fraction(2, 3)),
+    ((sympy.Rational(2, 3), sympy.Integer(4)), Fraction(1, 6)),
+    ((Fraction(1, 3), Fraction(2, 5)), Fraction(5, 6)),
+])
+def test_rational_arguments(backend, args, expected):
+    value = Rational(*args)._value
+    assert type(value) is backend._rational
+    assert (int(value.numerator), int(value.denominator)) == (expected.numerator, expected.denominator)
+
+
+def test_rational_of_backend_values(backend):
+    third = Rational(1, 3)._value
+    assert Rational(third)._value is third
+    assert Rational(third, Integer(2)._value)._value == Fraction(1, 6)
+
+    with pytest.raises(ZeroDivisionError):
+        Rational(1, 0)
+
+
+def test_round_trips(backend):
+    rng = random.Random(0)
+
+    for _ in range(100):
+        p = rng.randint(-10 ** 40, 10 ** 40)
+        q = rng.randint(1, 10 ** 30)
+
+        assert to_sympy(Integer(p)) == sympy.Integer(p)
+        assert to_python(Integer(p)) == p
+        assert type(to_python(Integer(p))) is int
+        assert Integer(to_sympy(Integer(p)))._value == p
+
+        r = Rational(p, q)
+        assert to_sympy(r) == sympy.Rational(p, q)
+        assert to_python(r) == float(Fraction(p, q))
+        assert Rational(to_sympy(r))._value == r._value
+
+
+def test_roundx(backend):
+    assert roundx(Integer(7))._value == 7.0
+    assert roundx(Rational(1, 4))._value == 0.25
+    assert isinstance(roundx(Rational(1, 3)), MachineReal)
+
+    n = roundx(Integer(10 ** 30 + 1), 40)
+    assert isinstance(n, PrecisionReal)
+    assert n._value == sympy.Float(10 ** 30 + 1, 40)
+    assert n._value._prec == sympy.Float(1, 40)._prec
+
+    r = roundx(Rational(1, 3), 40)
+    assert isinstance(r, PrecisionReal)
+    assert r._value == sympy.Rational(1, 3).n(40)
+
+
+def test_byte_count_deterministic(backend):
+    # freed values of gmpy2 are recycled with their limbs
+    garbage = [Rational(3 ** 300, 7 ** 200) for _ in range(50)] + [Integer(3 ** 300) for _ in range(50)]
+    del garbage
+
+    for _ in range(3):
+        assert Integer(5).byte_count == Integer(7).byte_count
+        assert Rational(1, 3).byte_count == Rational(2, 5).byte_count
+
+    assert Integer(3 ** 300).byte_count > Integer(5).byte_count
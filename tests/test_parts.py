@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from mathx.core.compare import sameQ
+from mathx.core.expression import Expr, Symbol
+from mathx.core.leaves import CHUNK
+from mathx.core.numbers import Integer
+from mathx.core.parts import append, drop, replace_part, take
+
+SymbolList = Symbol('List')
+SymbolF = Symbol('Global`f')
+
+
+def span(spec, n):
+    """
+    Reference of the leaves selected by a Take specification.
+    """
+    if isinstance(spec, int):
+        return list(range(n))[:spec] if spec >= 0 else list(range(n))[n + spec:]
+
+    m, k = spec
+    start = m - 1 if m > 0 else n + m
+    stop = k if k >= 0 else n + k + 1
+    return list(range(n))[start:stop]
+
+
+def random_spec(rng, n):
+    if rng.random() < 0.5:
+        return rng.randint(-n, n)
+
+    start = rng.randint(1, n + 1)
+    stop = rng.randint(start - 1, n)
+    m = start if start > n or rng.random() < 0.5 else start - n - 1
+    k = stop if rng.random() < 0.5 else stop - n - 1
+    return m, k
+
+
+def test_random_parts():
+    rng = random.Random(0)
+
+    for _ in range(20):
+        reference = [Integer(i) for i in range(rng.choice([0, 3, CHUNK - 1, CHUNK, 5 * CHUNK]))]
+        expr = Expr(SymbolList, *reference)
+
+        for _ in range(50):
+            n = len(reference)
+            op = rng.choice(['replace', 'append', 'take', 'drop'])
+
+            if op == 'replace' and n:
+                i = rng.choice([rng.randint(1, n), rng.randint(-n, -1)])
+                leaf = Integer(rng.randint(0, 10 ** 6))
+                expr = replace_part(expr, i, leaf)
+                reference[i - 1 if i > 0 else i] = leaf
+
+            elif op == 'append':
+                leaf = Integer(rng.randint(0, 10 ** 6))
+                expr = append(expr, leaf)
+                reference.append(leaf)
+
+            elif op == 'take' and rng.random() < 0.3:
+                spec = random_spec(rng, n)
+                expr = take(expr, spec)
+                reference = [reference[k] for k in span(spec, n)]
+
+            elif op == 'drop' and rng.random() < 0.3:
+                spec = random_spec(rng, n)
+                kept = set(span(spec, n))
+                expr = drop(expr, spec)
+                reference = [leaf for k, leaf in enumerate(reference) if k not in kept]
+
+            flat = Expr(SymbolList, *reference)
+            assert sameQ(expr, flat)
+            assert expr.leaf_count == flat.leaf_count
+            assert expr.depth == flat.depth
+
+
+def test_head_and_errors():
+    expr = Expr(SymbolList, *map(Integer, range(5)))
+
+    assert sameQ(replace_part(expr, 0, SymbolF), Expr(SymbolF, *map(Integer, range(5))))
+
+    for bad in (6, -6):
+        with pytest.raises(IndexError):
+            replace_part(expr, bad, Integer(0))
+
+    for spec in (6, -6, (0, 2), (3, 1), (2, 6)):
+        with pytest.raises(IndexError):
+            take(expr, spec)
+
+        with pytest.raises(IndexError):
+            drop(expr, spec)
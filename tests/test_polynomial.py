@@ -0,0 +1,203 @@
+import random
+
+from fractions import Fraction
+
+import pytest
+import sympy
+
+from mathx.core import numbers, polynomial
+from mathx.core.compare import sameQ
+from mathx.core.expression import Expr, Symbol
+from mathx.core.numbers import Integer, Rational
+from mathx.core.polynomial import Poly, PolynomialError, collect, expand, polynomial_gcd
+
+gens = Symbol('Global`x'), Symbol('Global`y'), Symbol('Global`z')
+sympy_gens = sympy.symbols('x y z')
+
+
+def random_poly(rng, terms, degree, coefficient):
+    return Poly({tuple(rng.randint(0, degree) for _ in gens): coefficient() for _ in range(terms)}, gens)
+
+
+def to_sympy(p):
+    terms = [(m, sympy.Rational(c.numerator, c.denominator)) for m, c in p.terms.items()]
+    return sympy.Poly.from_dict(dict(terms), *sympy_gens, domain='QQ') if terms else sympy.Poly(0, *sympy_gens, domain='QQ')
+
+
+def test_dense_product():
+    rng = random.Random(0)
+    coefficients = [
+        lambda: rng.randint(-3, 3),
+        lambda: rng.randint(-10 ** 30, 10 ** 30),
+        lambda: Fraction(rng.randint(-99, 99), rng.randint(1, 20)),
+    ]
+
+    for i in range(30):
+        a = random_poly(rng, rng.randint(30, 200), 4, coefficients[i % 3])
+        b = random_poly(rng, rng.randint(30, 200), 4, coefficients[(i // 3) % 3])
+        product = polynomial._dense_mul(a, b)
+
+        assert product is not None
+        assert to_sympy(product) == to_sympy(a) * to_sympy(b)
+
+
+def test_power():
+    x, y, z = (Poly.generator(i, gens) for i in range(3))
+    p = (1 + x + y + z) ** 20
+
+    assert len(p) == 1771
+    assert to_sympy(p) == sympy.Poly((1 + sum(sympy_gens)) ** 20, *sympy_gens, domain='QQ')
+
+
+def test_gcd():
+    rng = random.Random(1)
+
+    def coefficient():
+        return Fraction(rng.randint(-9, 9), rng.choice([1, 1, 2, 3]))
+
+    for _ in range(100):
+        c = random_poly(rng, rng.randint(1, 3), 3, coefficient)
+        a = random_poly(rng, rng.randint(0, 4), 3, coefficient) * c
+        b = random_poly(rng, rng.randint(0, 4), 3, coefficient) * c
+        g = a.gcd(b)
+        expected = to_sympy(a).gcd(to_sympy(b))
+
+        # equal up to a rational factor
+        assert to_sympy(g).monic() == expected.monic()
+        assert all(isinstance(c, int) for c in g.terms.values())
+
+
+x, y, z = gens
+SymbolPlus, SymbolTimes, SymbolPower = Symbol('Plus'), Symbol('Times'), Symbol('Power')
+
+
+def plus(*leaves):
+    return Expr(SymbolPlus, *leaves)
+
+
+def times(*leaves):
+    return Expr(SymbolTimes, *leaves)
+
+
+def power(base, k):
+    return Expr(SymbolPower, base, Integer(k))
+
+
+def to_sympy_expr(expr):
+    if isinstance(expr, Symbol):
+        return sympy.Symbol(expr.name)
+
+    if isinstance(expr, (Integer, Rational)):
+        return numbers.to_sympy(expr)
+
+    leaves = [to_sympy_expr(leaf) for leaf in expr.leaves]
+    return {SymbolPlus: sympy.Add, SymbolTimes: sympy.Mul, SymbolPower: sympy.Pow}[expr.head](*leaves)
+
+
+def random_expr(rng, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice([x, y, z, Integer(rng.randint(-5, 5)), Rational(rng.randint(-5, 5), rng.randint(1, 4))])
+
+    kind = rng.choice(['plus', 'times', 'power'])
+
+    if kind == 'power':
+        return power(random_expr(rng, depth - 1), rng.randint(0, 3))
+
+    leaves = [random_expr(rng, depth - 1) for _ in range(rng.randint(1, 3))]
+    return plus(*leaves) if kind == 'plus' else times(*leaves)
+
+
+def nested(expr, head):
+    """
+    Whether a head expression has a leaf with the same head.
+    """
+    if expr.is_atom:
+        return False
+
+    return (expr.head is head and any(not leaf.is_atom and leaf.head is head for leaf in expr.leaves)) or \
+        any(nested(leaf, head) for leaf in expr.leaves)
+
+
+def test_from_expr():
+    expr = plus(times(Integer(2), x, y), power(x, 2), Integer(3), Rational(1, 2), times(Integer(-1), x, y))
+    p = Poly.from_expr(expr)
+
+    assert p.gens == gens[:2]
+    assert p.terms == {(1, 1): 1, (2, 0): 1, (0, 0): Fraction(7, 2)}
+    assert Poly.from_expr(x, gens).terms == {(1, 0, 0): 1}
+
+    for bad in (power(x, -1), Expr(Symbol('Global`f'), x), Expr(SymbolPower, x, Rational(1, 2))):
+        with pytest.raises(PolynomialError):
+            Poly.from_expr(bad)
+
+    with pytest.raises(PolynomialError):
+        Poly.from_expr(z, gens[:2])
+
+
+def test_to_expr():
+    assert sameQ(Poly.from_expr(power(plus(x, Integer(1)), 2)).to_expr(),
+                 plus(Integer(1), times(Integer(2), x), power(x, 2)))
+    assert sameQ(Poly.from_expr(plus(y, times(Integer(-1), x))).to_expr(), plus(times(Integer(-1), x), y))
+    assert sameQ(Poly.from_expr(times(Rational(1, 3), x, power(y, 2))).to_expr(), times(Rational(1, 3), x, power(y, 2)))
+    assert sameQ(Poly.from_expr(plus(x, times(Integer(-1), x))).to_expr(), Integer(0))
+    assert sameQ(Poly.from_expr(Integer(5)).to_expr(), Integer(5))
+
+
+def test_expand():
+    rng = random.Random(2)
+
+    for _ in range(100):
+        expr = random_expr(rng, 4)
+        expanded = expand(expr)
+
+        assert sympy.expand(to_sympy_expr(expanded) - to_sympy_expr(expr)) == 0
+        assert sameQ(expand(expanded), expanded)
+        assert not nested(expanded, SymbolPlus) and not nested(expanded, SymbolTimes)
+
+
+def test_collect():
+    assert sameQ(collect(times(Integer(2), x, y), x), times(Integer(2), x, y))
+    assert sameQ(collect(times(x, y), x), times(x, y))
+
+    expr = plus(times(x, y), x, y, times(power(x, 2), y), times(power(x, 2), z), times(Integer(3), y, power(x, 3)))
+    expected = plus(y, times(plus(Integer(1), y), x), times(plus(y, z), power(x, 2)),
+                    times(Integer(3), power(x, 3), y))
+    assert sameQ(collect(expr, x), expected)
+
+    rng = random.Random(3)
+
+    for _ in range(100):
+        expr = random_expr(rng, 4)
+        collected = collect(expr, x)
+
+        assert Poly.from_expr(collected, gens) == Poly.from_expr(expr, gens)
+        assert not nested(collected, SymbolPlus) and not nested(collected, SymbolTimes)
+
+
+def test_polynomial_gcd():
+    a = plus(power(x, 2), Integer(-1))
+    b = plus(power(x, 2), times(Integer(2), x), Integer(1))
+    assert sameQ(polynomial_gcd(a, b), plus(Integer(1), x))
+
+    c = plus(times(x, y), z)
+    a = expand(times(c, plus(x, Integer(2))))
+    b = expand(times(Integer(3), c, power(plus(y, Integer(-1)), 2)))
+    assert sameQ(polynomial_gcd(a, b), plus(z, times(x, y)))
+    assert sameQ(polynomial_gcd(x, y), Integer(1))
+
+
+def test_dense_round_trip():
+    numpy = pytest.importorskip('numpy')
+    rng = random.Random(4)
+
+    for coefficient in (lambda: rng.randint(-9, 9), lambda: rng.randint(-10 ** 30, 10 ** 30),
+                        lambda: Fraction(rng.randint(-9, 9), rng.randint(1, 5))):
+        p = random_poly(rng, 20, 3, coefficient)
+        dense = p.to_dense()
+
+        assert dense.shape == tuple(p.degree(i) + 1 for i in range(3))
+        assert Poly.from_dense(dense, gens) == p
+
+    assert Poly.from_expr(plus(x, Integer(1)), gens).to_dense().dtype == numpy.int64
+    cube = expand(power(plus(x, y), 3))
+    assert sameQ(Poly.from_dense(Poly.from_expr(cube).to_dense(), gens[:2]).to_expr(), cube)
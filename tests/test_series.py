@@ -0,0 +1,72 @@
+import math
+
+from fractions import Fraction
+
+import sympy
+
+from mathx.core.numbers import Integer, MachineReal, PrecisionReal, Rational
+from mathx.core.series import Series, levin
+
+
+def sin_series() -> Series:
+    return Series(lambda n: Fraction((-1) ** (n // 2), math.factorial(n)) if n % 2 else 0, 1)
+
+
+def cos_series() -> Series:
+    return Series(lambda n: 0 if n % 2 else Fraction((-1) ** (n // 2), math.factorial(n)))
+
+
+def test_levin_zero_terms():
+    assert abs(levin(sin_series().terms(1))._value - math.sin(1)) < 1e-14
+    assert abs(levin(cos_series().terms(2))._value - math.cos(2)) < 1e-14
+
+
+def test_levin_finite():
+    assert levin([1, 2, 3])._value == 6
+    assert levin(Series.from_coefficients([1, 0, 0, 3]).terms(2))._value == 25
+
+
+def test_compose_stream():
+    x = Series.variable()
+    inner = Series.from_iterable(range(100))
+    assert inner[3] == 3
+
+    composed = x.compose(inner)
+    assert [composed[n] for n in range(6)] == [0, 1, 2, 3, 4, 5]
+
+    exp = Series(lambda n: Fraction(1, math.factorial(n)))
+    log1p = Series.from_iterable(Fraction((-1) ** (n + 1), n) if n else 0 for n in range(100))
+    assert [exp.compose(log1p)[n] for n in range(6)] == [1, 1, 0, 0, 0, 0]
+
+
+def test_mathx_numbers():
+    exp = Series(lambda n: Fraction(1, math.factorial(n)))
+
+    assert [(exp * Integer(2))[n] for n in range(3)] == [2, 2, 1]
+    assert [(Series.constant(Integer(2)) + exp)[n] for n in range(3)] == [3, 1, Fraction(1, 2)]
+    assert [(exp / Rational(1, 2))[n] for n in range(3)] == [2, 2, 1]
+
+    value = exp.evaluate(MachineReal(0.5), 20)
+    assert isinstance(value, MachineReal) and abs(value._value - math.exp(0.5)) < 1e-15
+
+    value = exp.evaluate(Rational(1, 2), 3)
+    assert isinstance(value, Rational) and value._value == Fraction(13, 8)
+
+    x = PrecisionReal(sympy.Float('0.5', 40))
+    value = exp.evaluate(x, 60)
+    assert isinstance(value, PrecisionReal) and value._value._prec == x._value._prec
+    assert abs(value._value - sympy.exp(sympy.Float('0.5', 40))) < sympy.Float('1e-38')
+
+    rule = Series(lambda n: Integer(n))
+    assert [(rule * rule)[n] for n in range(4)] == [0, 0, 1, 4]
+    assert abs(levin((Rational((-1) ** n, n + 1) for n in range(20)), 12)._value - math.log(2)) < 1e-14
+
+
+def test_power():
+    p = Series.from_coefficients([1, 1]) ** 1500
+    assert [p[n] for n in range(6)] == [math.comb(1500, n) for n in range(6)]
+
+    q = Series.from_coefficients([0, 2, 3]) ** 7
+    expected = sympy.Poly((2 * sympy.Symbol('x') + 3 * sympy.Symbol('x') ** 2) ** 7).all_coeffs()[::-1]
+    assert [q[n] for n in range(15)] == [0] * 7 + [int(c) for c in expected[7:]]
+    assert (q ** 0)[0] == 1 and (q ** 0)[1] == 0
@@ -0,0 +1,191 @@
+import os
+import random
+import sys
+
+from array import array
+
+import pytest
+import sympy
+
+from mathx.core.compare import sameQ
+from mathx.core.expression import Expr, Symbol
+from mathx.core.leaves import LeafVector, PackedLeaves
+from mathx.core.numbers import Complex, Integer, MachineReal, PrecisionReal, Rational
+from mathx.core.store import ExprStore, dump
+from mathx.core.string import String
+
+SymbolList = Symbol('List')
+SymbolF = Symbol('Global`f')
+
+
+def random_expr(rng: random.Random, depth: int) -> Expr:
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice([
+            lambda: Integer(rng.randint(-10 ** 30, 10 ** 30)),
+            lambda: Rational(rng.randint(-99, 99), rng.randint(1, 99)),
+            lambda: MachineReal(rng.uniform(-1e10, 1e10)),
+            lambda: PrecisionReal(sympy.Float(rng.uniform(-1, 1), 30)),
+            lambda: SymbolF,
+        ])()
+
+    head = rng.choice([SymbolList, SymbolF])
+    return Expr(head, *(random_expr(rng, depth - 1) for _ in range(rng.randint(0, 5))))
+
+
+def test_store_of_store(tmp_path):
+    rng = random.Random(0)
+    shared = Expr(SymbolF, Integer(1), Rational(1, 2))
+    expr = Expr(SymbolList, *(random_expr(rng, 4) for _ in range(20)), *([shared] * 50))
+
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as a:
+        dump(a.root, tmp_path / 'b.mx')
+
+        with ExprStore(tmp_path / 'b.mx') as b:
+            assert sameQ(expr, b.root)
+            assert b.root.leaf_count == expr.leaf_count
+            assert b.root.depth == expr.depth
+
+
+def test_close_with_decoded_expressions(tmp_path):
+    packed = Expr(SymbolList, *(MachineReal(i / 7) for i in range(100)))
+    expr = Expr(SymbolList, packed, *(Expr(SymbolF, Integer(i)) for i in range(100)))
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        root = store.root
+        first = root.leaves[0]
+
+    # leaves not decoded yet are still read from the map
+    assert sameQ(root, expr)
+    assert first.leaves[99]._value == 99 / 7
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        assert sameQ(store.root, expr)
+
+
+def assert_atom(stored, atom):
+    assert type(stored) is type(atom)
+
+    if isinstance(atom, Complex):
+        assert_atom(stored._real, atom._real)
+        assert_atom(stored._imag, atom._imag)
+
+    elif isinstance(atom, MachineReal):
+        assert stored._value.hex() == atom._value.hex()
+
+    elif isinstance(atom, PrecisionReal):
+        assert stored._value._mpf_ == atom._value._mpf_
+        assert stored._value._prec == atom._value._prec
+
+    elif isinstance(atom, (Integer, Rational, String)):
+        assert stored._value == atom._value
+
+    else:
+        assert stored is atom
+
+
+def test_atoms(tmp_path):
+    atoms = [
+        Symbol('Global`x'), Symbol('List'), String(''), String('h\u00e9llo\n'),
+        Integer(0), Integer(-1), Integer(2 ** 63), Integer(-3 ** 200),
+        Rational(-7, 3), Rational(10 ** 40 + 1, 3 ** 30),
+        MachineReal(0.0), MachineReal(-0.0), MachineReal(1e308),
+        PrecisionReal(sympy.Float(0, 30)), PrecisionReal(sympy.Float('-1.5e-300', 50)),
+        PrecisionReal(sympy.Float(sympy.pi, 100)),
+        Complex(MachineReal(1.0), MachineReal(-0.0)), Complex(Integer(1), Rational(1, 2)),
+    ]
+    dump(Expr(SymbolList, *atoms), tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        for stored, atom in zip(store.root.leaves, atoms):
+            assert_atom(stored, atom)
+
+
+def test_packed(tmp_path):
+    reals = Expr(SymbolList, *(MachineReal(i / 3) for i in range(50)))
+    integers = Expr(SymbolList, *(Integer(i) for i in (-2 ** 63, 2 ** 63 - 1, 0, 5)))
+    wide = Expr(SymbolList, Integer(2 ** 63), Integer(0))
+    mixed = Expr(SymbolList, Integer(1), MachineReal(1.0))
+    view = Expr.from_leaves(SymbolList, PackedLeaves(array('q', range(10)), Integer))
+    expr = Expr(SymbolF, reals, integers, wide, mixed, view)
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        root = store.root
+        assert sameQ(root, expr)
+
+        for stored, typecode in zip(root.leaves, ['d', 'q', None, None, 'q']):
+            if typecode is None:
+                assert not isinstance(stored.leaves, PackedLeaves)
+
+            else:
+                assert stored.leaves.typecode == typecode
+
+
+def test_shared_written_once(tmp_path):
+    shared = Expr(SymbolF, *(Integer(10 ** 30 + i) for i in range(100)))
+    dump(Expr(SymbolList, shared), tmp_path / 'one.mx')
+    dump(Expr(SymbolList, *([shared] * 100)), tmp_path / 'many.mx')
+
+    # each further reference costs one offset
+    one, many = os.path.getsize(tmp_path / 'one.mx'), os.path.getsize(tmp_path / 'many.mx')
+    assert many - one == 99 * 8
+
+    with ExprStore(tmp_path / 'many.mx') as store:
+        leaves = store.root.leaves
+        assert all(leaf is leaves[0] for leaf in leaves)
+
+
+def test_random_round_trip(tmp_path):
+    rng = random.Random(1)
+
+    for k in range(10):
+        expr = Expr(SymbolList, *(random_expr(rng, 5) for _ in range(rng.randint(0, 40))))
+
+        if k % 2:
+            expr = Expr.from_leaves(SymbolF, LeafVector(expr.leaves))
+
+        dump(expr, tmp_path / f'{k}.mx')
+
+        with ExprStore(tmp_path / f'{k}.mx') as store:
+            root = store.root
+            assert sameQ(root, expr)
+            assert root.leaf_count == expr.leaf_count
+            assert root.depth == expr.depth
+
+            # the same tree up to the size of the leaf storages
+            assert root.byte_count - sys.getsizeof(root.leaves) == expr.byte_count - sys.getsizeof(expr.leaves)
+
+
+def test_huge_rational(tmp_path):
+    numerator, denominator = -3 ** 20000, 7 ** 6000 * 2
+    rational = Rational(numerator, denominator)
+    dump(Expr(SymbolList, rational, Rational(0), Rational(-1, 2 ** 64)), tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        stored = store.root.leaves
+
+        assert int(stored[0]._value.numerator) == numerator
+        assert int(stored[0]._value.denominator) == denominator
+        assert stored[1]._value == 0
+        assert stored[2]._value == Rational(-1, 2 ** 64)._value
+
+
+def test_leaves_equality(tmp_path):
+    expr = Expr(SymbolList, *(Expr(SymbolF, Integer(i)) for i in range(50)),
+                Expr(SymbolList, *(MachineReal(i / 3) for i in range(20))))
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as a, ExprStore(tmp_path / 'a.mx') as b:
+        leaves = a.root.leaves
+        packed = leaves[-1].leaves
+
+        # decoded again once the first leaves are freed
+        assert leaves == a.root.leaves
+        assert packed == a.root.leaves[-1].leaves == b.root.leaves[-1].leaves
+        assert hash(packed) == hash(b.root.leaves[-1].leaves)
+
+        with pytest.raises(TypeError):
+            hash(leaves)
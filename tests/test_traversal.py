@@ -0,0 +1,220 @@
+from array import array
+from collections import Counter
+
+import pytest
+
+from mathx.core.expression import Expr, Symbol
+from mathx.core.leaves import PackedLeaves
+from mathx.core.compare import sameQ
+from mathx.core.numbers import Integer, MachineReal
+from mathx.core.store import ExprStore, dump
+from mathx.core.traversal import (cases, iter_cases, iter_level, iter_position, level, levels, map_all, map_expr,
+                                  position, replace_all)
+
+SymbolList = Symbol('List')
+SymbolF = Symbol('Global`f')
+SymbolG = Symbol('Global`g')
+SymbolH = Symbol('Global`h')
+SymbolK = Symbol('Global`k')
+a, b, c = Symbol('Global`a'), Symbol('Global`b'), Symbol('Global`c')
+
+
+def tree():
+    # f[a, g[b, c], h[g[a]]]
+    gbc = Expr(SymbolG, b, c)
+    ga = Expr(SymbolG, a)
+    hga = Expr(SymbolH, ga)
+    return Expr(SymbolF, a, gbc, hga), gbc, ga, hga
+
+
+def same_nodes(result, expected):
+    return len(result) == len(expected) and all(x is y for x, y in zip(result, expected))
+
+
+def k(*leaves):
+    return Expr(SymbolK, *leaves)
+
+
+def packed_list(values, typecode='d'):
+    element = MachineReal if typecode == 'd' else Integer
+    return Expr.from_leaves(SymbolList, PackedLeaves(array(typecode, values), element))
+
+
+def test_packed_unchanged():
+    packed = packed_list([0.5, 1.5, 2.5])
+    expr = Expr(SymbolF, packed, packed_list([1, 2, 3], 'q'))
+
+    assert replace_all(expr, [(SymbolG, SymbolF)]) is expr
+    assert replace_all(expr, [(lambda node: False, SymbolF)]) is expr
+    assert map_all(lambda node: node, expr) is expr
+    assert map_expr(lambda node: node, expr, None) is expr
+
+
+def test_packed_replaced():
+    packed = packed_list([0.5, 1.5, 2.5])
+
+    result = replace_all(packed, [(SymbolList, SymbolF)])
+    assert result.head is SymbolF and result.leaves is packed.leaves
+
+    result = replace_all(packed, [(MachineReal(1.5), Integer(0))])
+    assert [type(leaf) for leaf in result.leaves] == [MachineReal, Integer, MachineReal]
+
+    result = map_expr(lambda node: MachineReal(node._value * 2), packed)
+    assert [leaf._value for leaf in result.leaves] == [1.0, 3.0, 5.0]
+
+
+def test_stored_leaves(tmp_path):
+    # stored leaves are new objects on every access unless referenced
+    expr = Expr(SymbolList, *(Expr(SymbolF, Integer(i), Integer(i + 1)) for i in range(300)))
+    dump(expr, tmp_path / 'a.mx')
+
+    with ExprStore(tmp_path / 'a.mx') as store:
+        root = store.root
+        result = replace_all(root, [(SymbolF, SymbolG)])
+        assert sameQ(result, Expr(SymbolList, *(Expr(SymbolG, Integer(i), Integer(i + 1)) for i in range(300))))
+
+        result = map_all(lambda node: Integer(node._value * 2) if isinstance(node, Integer) else node, root)
+        assert sameQ(result, Expr(SymbolList, *(Expr(SymbolF, Integer(2 * i), Integer(2 * i + 2)) for i in range(300))))
+
+        assert sameQ(replace_all(root, [(SymbolG, SymbolF)]), expr)
+
+
+def test_levels():
+    assert levels(2) == (1, 2)
+    assert levels((2,)) == (2, 2)
+    assert levels((1, -2)) == (1, -2)
+    assert levels(None)[0] == 0
+
+
+@pytest.mark.parametrize('spec, expected', [
+    (1, lambda e, gbc, ga, hga: [a, gbc, hga]),
+    (2, lambda e, gbc, ga, hga: [a, b, c, gbc, ga, hga]),
+    ((2,), lambda e, gbc, ga, hga: [b, c, ga]),
+    ((0,), lambda e, gbc, ga, hga: [e]),
+    ((0, 1), lambda e, gbc, ga, hga: [a, gbc, hga, e]),
+    (None, lambda e, gbc, ga, hga: [a, b, c, gbc, a, ga, hga, e]),
+    ((-1,), lambda e, gbc, ga, hga: [a, b, c, a]),
+    ((-2,), lambda e, gbc, ga, hga: [gbc, ga]),
+    ((2, -2), lambda e, gbc, ga, hga: [ga]),
+    ((1, -2), lambda e, gbc, ga, hga: [gbc, ga, hga]),
+    (0, lambda e, gbc, ga, hga: []),
+])
+def test_level(spec, expected):
+    e, gbc, ga, hga = tree()
+    expected = expected(e, gbc, ga, hga)
+
+    assert same_nodes(level(e, spec), expected)
+    assert same_nodes(list(iter_level(e, spec)), expected)
+
+
+def test_position_cases():
+    e, gbc, ga, hga = tree()
+    has_g = lambda node: not node.is_atom and node.head is SymbolG
+
+    assert position(e, a) == [(1,), (3, 1, 1)]
+    assert position(e, a, 1) == [(1,)]
+    assert position(e, has_g) == [(2,), (3, 1)]
+    assert position(e, e) == [()]
+    assert list(iter_position(e, b)) == [(2, 1)]
+
+    assert same_nodes(cases(e, has_g), [gbc])
+    assert same_nodes(cases(e, has_g, None), [gbc, ga])
+    assert same_nodes(cases(e, a, (-1,)), [a, a])
+    assert same_nodes(list(iter_cases(e, has_g, (2,))), [ga])
+
+
+def test_lazy():
+    # the first part is found without walking the rest
+    calls = []
+
+    def match(node):
+        calls.append(node)
+        return True
+
+    expr = Expr(SymbolList, *(Expr(SymbolF, Integer(i)) for i in range(1000)))
+
+    assert next(iter_cases(expr, match)) is expr.leaves[0]
+    assert len(calls) == 1
+    assert next(iter_position(expr, match, (-1,))) == (1, 1)
+    assert next(iter_level(expr, None)) is expr.leaves[0].leaves[0]
+
+
+def test_map_expr_levels():
+    e, gbc, ga, hga = tree()
+
+    assert sameQ(map_expr(SymbolK, e), Expr(SymbolF, k(a), k(gbc), k(hga)))
+    assert sameQ(map_expr(SymbolK, e, (2,)), Expr(SymbolF, a, Expr(SymbolG, k(b), k(c)), Expr(SymbolH, k(ga))))
+    assert sameQ(map_expr(SymbolK, e, (-1,)),
+                 Expr(SymbolF, k(a), Expr(SymbolG, k(b), k(c)), Expr(SymbolH, Expr(SymbolG, k(a)))))
+    assert sameQ(map_expr(SymbolK, e, (0,)), k(e))
+    assert sameQ(map_expr(SymbolK, e, (2, -2)), Expr(SymbolF, a, gbc, Expr(SymbolH, k(ga))))
+
+    # inner parts first
+    expected = k(Expr(SymbolH, k(Expr(SymbolG, k(a)))))
+    assert sameQ(map_expr(SymbolK, hga, None), expected)
+    assert sameQ(map_all(SymbolK, hga), expected)
+
+
+def test_replace_all():
+    e, gbc, ga, hga = tree()
+
+    # the first matching rule is used
+    assert sameQ(replace_all(e, [(a, b), (a, c)]), Expr(SymbolF, b, gbc, Expr(SymbolH, Expr(SymbolG, b))))
+
+    # heads are replaced
+    assert sameQ(replace_all(e, [(SymbolG, SymbolK)]),
+                 Expr(SymbolF, a, Expr(SymbolK, b, c), Expr(SymbolH, Expr(SymbolK, a))))
+
+    # a replaced part is not searched again, nor descended
+    assert sameQ(replace_all(e, [(a, ga)]), Expr(SymbolF, ga, gbc, Expr(SymbolH, Expr(SymbolG, ga))))
+    assert sameQ(replace_all(e, [(ga, a), (a, b)]), Expr(SymbolF, b, gbc, Expr(SymbolH, a)))
+    assert sameQ(replace_all(e, [(lambda node: node is gbc, lambda node: node.leaves[0])]),
+                 Expr(SymbolF, a, b, hga))
+
+
+def test_identity():
+    e, gbc, ga, hga = tree()
+
+    assert replace_all(e, [(SymbolK, a)]) is e
+    assert map_expr(lambda node: node, e, None) is e
+    assert map_all(lambda node: node, e) is e
+
+    # unchanged branches are kept
+    result = replace_all(e, [(c, a)])
+    assert result.leaves[0] is a and result.leaves[2] is hga
+
+    result = map_expr(lambda node: a if node is b else node, e, (-1,))
+    assert result.leaves[2] is hga and sameQ(result.leaves[1], Expr(SymbolG, a, c))
+
+
+def test_shared_once():
+    shared = Expr(SymbolG, a, Expr(SymbolH, b))
+    expr = Expr(SymbolList, *([shared] * 100))
+    seen = Counter()
+
+    def count(node):
+        seen[id(node)] += 1
+        return node
+
+    def match(node):
+        seen[id(node)] += 1
+        return False
+
+    map_all(count, expr)
+    assert seen[id(shared)] == 1 and max(seen.values()) == 1
+
+    seen.clear()
+    map_expr(count, expr, None)
+    assert seen[id(shared)] == 1 and max(seen.values()) == 1
+
+    seen.clear()
+    assert replace_all(expr, [(match, a)]) is expr
+    assert seen[id(shared)] == 1 and max(seen.values()) == 1
+
+    seen.clear()
+    assert position(expr, lambda node: match(node) or node is b) == [(i, 2, 1) for i in range(1, 101)]
+    assert seen[id(shared)] == 1 and max(seen.values()) == 1
+
+    seen.clear()
+    result = replace_all(expr, [(lambda node: node is shared, lambda node: count(a))])
+    assert seen[id(a)] == 1 and all(leaf is a for leaf in result.leaves)